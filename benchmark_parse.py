@@ -0,0 +1,36 @@
+# project_root/benchmark_parse.py
+
+# compares the OpenSSH log parsing engines (and worker counts) on the same log file.
+# usage: python benchmark_parse.py [path to log file] [max workers]
+import sys
+import time
+
+from classes.opensshlog_class import OpenSSHLogonData
+
+
+def benchmark(path_to_logfile, engine, workers=1, repeats=3):
+    # returns the best wall time of a few runs and the parsed dataframe
+    best_secs = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df = OpenSSHLogonData.parse_log(path_to_logfile, workers=workers, engine=engine)
+        secs = time.perf_counter() - start
+        best_secs = secs if best_secs is None else min(best_secs, secs)
+    return best_secs, df
+
+
+def main():
+    path_to_logfile = sys.argv[1] if len(sys.argv) > 1 else "./data_in/SSH.log"
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    reference_secs = None
+    for engine in OpenSSHLogonData.PARSE_ENGINES:
+        for workers in sorted({1, max_workers}):
+            secs, df = benchmark(path_to_logfile, engine, workers)
+            reference_secs = reference_secs or secs
+            print(f"{engine:12} workers={workers:<3} {secs:8.2f} s  {len(df) / secs:12,.0f} lines/s  "
+                  f"x{reference_secs / secs:.2f} vs line engine")
+
+
+if __name__ == "__main__":
+    main()
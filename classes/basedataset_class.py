@@ -5,20 +5,35 @@ import pandas as pd
 import numpy as np
 import csv
 import os
+from collections import defaultdict
+from contextlib import ExitStack
 from datetime import datetime
 # for multi-thread operation demo
 import threading
 
+# optional: columnar output (parquet, feather) requires pyarrow
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as pa_dataset
+    import pyarrow.feather as pa_feather
+    import pyarrow.parquet as pa_parquet
+except ImportError:
+    pa = None
+
 from classes.logger import Logger
 logger = Logger().get_logger()
 
 from classes.task_manager import TaskManager
+from classes.compressed_input import CompressedInput
+from classes.column_index import ColumnIndex
+from classes.query_planner import QueryPlanner
+from classes.time_index import TimeIndex
 # task_mgr = TaskManager()
 task_mgr = TaskManager.get_taskmgr(max_threads=2)
 
 
-from constants import UNKNOWN
-from decorators import requires_loaded_data, log_method_call
+from constants import UNKNOWN, FORMAT_CSV, FORMAT_PARQUET, FORMAT_FEATHER
+from decorators import requires_loaded_data, log_method_call, invalidates_indexes
 from classes.custom_exceptions import DatasetMandatoryFieldsMissing, SearchColumnsMissing
 
 
@@ -31,13 +46,28 @@ class BaseDataset:
     DEFAULT_CSV_DELIMITER = ","
     DEFAULT_CSV_QUOTECHAR = '"'
     DEFAULT_DATA_TYPE = "str"
+    # csv columns with a type other than DEFAULT_DATA_TYPE: column label -> pandas dtype. set by child classes.
+    CSV_SCHEMA = {}
     DEFAULT_QUOTING = csv.QUOTE_ALL
+    DEFAULT_PARQUET_COMPRESSION = "zstd"
+    DEFAULT_FEATHER_COMPRESSION = "lz4"     # fast to read back
     
     # constants for common column labels
     LOAD_DATE_COL = "Load_Date"
     UNIX_TIMESTAMP_SEC = "Unix_Timestamp_Secs"
+    PARTITION_DAY_COL = "Partition_Day"     # partitioning of columnar output by day (YYYY-MM-DD), derived from UNIX_TIMESTAMP_SEC
     
     DEFAULT_DATE_FORMAT = "%Y-%m-%d"
+    YEAR_ROLLOVER_SECS = 183 * 86400    # add_timestamps: a jump back in time of more than half a year is a turn of the year
+
+    # search(): return types of the results
+    RETURN_LIST = "list"
+    RETURN_ARRAY = "array"
+    RETURN_GENERATOR = "generator"
+    RETURN_TYPES = [RETURN_LIST, RETURN_ARRAY, RETURN_GENERATOR]
+    GENERATOR_CHUNK_ROWS = 65536        # RETURN_GENERATOR: values converted to Python objects per step
+    BUCKET_MINUTE = 60                  # event_counts(): bucket sizes in seconds
+    BUCKET_HOUR = 3600
     
     # default columns with default values that shall be added once data is loaded.
     DEFAULT_COLUMNS = {
@@ -57,6 +87,7 @@ class BaseDataset:
         """
         self.dataset_config = dataset_config
         self.lock = threading.Lock()  # instance level lock to be used by thread-safe operations
+        self._indexes = {}  # cached indexes of self.df (see get_cached_index()), dropped whenever self.df changes
         self.df = None  # placeholder and a flag to see if data has been loaded.
 
         if self.dataset_config.load_data:   # immediate data loading requested.
@@ -79,7 +110,8 @@ class BaseDataset:
                 data_format = self.dataset_config.data_input_format.lower()
 
                 if data_format == "csv":
-                    self.df = self.from_csv(self.dataset_config.get_input_path())
+                    self.df = self.from_csv(self.dataset_config.get_input_path(), columns=self.dataset_config.load_columns,
+                                            chunksize=self.dataset_config.csv_chunk_rows)
                 elif data_format == "json":
                     self.df = self.from_json(self.dataset_config.get_input_path())
                 else:
@@ -90,40 +122,107 @@ class BaseDataset:
                 logger.info(f"Dataset '{self.dataset_config.get_id()}' loaded successfully from '{self.dataset_config.get_input_path()}' in thread {threading.current_thread().name}.")
 
         if use_taskmgr:
-            task_mgr.submit(load_operation)  # send the task to task manager
+            return task_mgr.submit(load_operation)  # send the task to task manager, return its Future
         else:
             load_operation()  # run the task in the main thread
 
 
+    async def load_data_async(self, timeout=None):
+        """
+        coroutine: loads the data on the task manager thread pool, e.g., to load many datasets concurrently with
+        asyncio.gather(*(dataset.load_data_async() for dataset in datasets)).
+
+        Args:
+            timeout (float): seconds to wait for the data, None = no limit (see TaskManager.submit_async())
+        """
+        await task_mgr.submit_async(self.load_data, timeout=timeout)
+
+
     def validate_input_file(self, filepath):
         """
         Validate the input file path to ensure it exists and is a file.
-        To be extended.
+        For a member of an archive ("archive.tar.gz::member") the archive is checked.
         """
+        filepath = CompressedInput.file_path(filepath)
         if not os.path.exists(filepath):
             raise FileNotFoundError(f"Error while loading dataset '{self.dataset_config.get_id()}'. The source file '{filepath}' does not exist.")
         if not os.path.isfile(filepath):
             raise ValueError(f"Error while loading dataset '{self.dataset_config.get_id()}'. The source file specified '{filepath}' is not a file.")
 
 
-    def from_csv(self, filepath, **kwargs):
+    def from_csv(self, filepath, columns=None, chunksize=None, **kwargs):
         """
         Default method to load data from a CSV file.
+        Columns listed in CSV_SCHEMA are read with their (typed) dtype, all the others as strings.
+        With chunksize the file is read in chunks of that many rows (see iter_csv()) that are then combined one column
+        at a time (see concat_columns()): the peak memory is about the size of the resulting dataframe plus its largest
+        column, instead of twice the size - for large files. To process a file that does not fit into memory, use
+        iter_csv(), which holds one chunk at a time.
+
+        Args:
+            filepath (str): path to the CSV file
+            columns (list): columns to load in addition to the mandatory fields, None = all columns of the file
+            chunksize (int): number of rows per chunk, None = read the file in one go
+            **kwargs: passed on to pd.read_csv()
+        """
+        chunks = list(self.iter_csv(filepath, columns=columns, chunksize=chunksize, **kwargs))
+        if len(chunks) == 1:
+            return chunks[0]
+        return self.concat_columns(chunks)
+
+
+    @staticmethod
+    def concat_columns(frames):
+        """
+        concatenates dataframes with the same columns (e.g., CSV chunks) one column at a time. every column is dropped
+        from the frames as soon as it has been copied, so the frames and the result together never hold more than one
+        column twice. the frames are emptied.
+        """
+        if not frames:
+            return pd.DataFrame()
+        columns = {}
+        for label in list(frames[0].columns):
+            columns[label] = pd.concat([frame[label] for frame in frames], ignore_index=True)
+            for frame in frames:
+                del frame[label]
+        return pd.DataFrame(columns, copy=False)
+
+
+    def iter_csv(self, filepath, columns=None, chunksize=None, **kwargs):
+        """
+        generator of the CSV file as dataframes of up to chunksize rows each (one dataframe without chunksize).
+        arguments are the same as for from_csv(); use it directly to process files that do not fit into memory.
         """
         kwargs.setdefault("encoding", self.DEFAULT_ENCODING)
         kwargs.setdefault("delimiter", self.DEFAULT_CSV_DELIMITER)
         kwargs.setdefault("quotechar", self.DEFAULT_CSV_QUOTECHAR)
-        kwargs.setdefault("dtype", self.DEFAULT_DATA_TYPE)
+        if "dtype" not in kwargs:
+            kwargs["dtype"] = defaultdict(lambda: self.DEFAULT_DATA_TYPE, self.CSV_SCHEMA)
+        if columns is not None:
+            # column projection: the mandatory fields plus the requested columns. missing ones are left to validate_mandatory_fields()
+            wanted_columns = set(self.dataset_config.mandatory_fields) | set(columns)
+            kwargs.setdefault("usecols", lambda column: column in wanted_columns)
 
         # Attempt to load the CSV file
         try:
-            dataframe = pd.read_csv(filepath, **kwargs)
+            with ExitStack() as stack:
+                source = filepath
+                if CompressedInput.is_compressed(filepath):     # decompressed while read, incl. tar members
+                    source = stack.enter_context(CompressedInput.open(filepath))
+                    kwargs.setdefault("compression", None)
+                if chunksize is None:
+                    yield pd.read_csv(source, **kwargs)
+                    return
+                with pd.read_csv(source, chunksize=chunksize, **kwargs) as reader:
+                    for chunk in reader:
+                        yield chunk
         except pd.errors.EmptyDataError as e:
             raise ValueError(f"Error while loading dataset '{self.dataset_config.get_id()}'. The file '{filepath}' is empty or invalid: {e}")
         except pd.errors.ParserError as e:
             raise ValueError(f"Error while loading dataset '{self.dataset_config.get_id()}'. Parsing error while reading the file '{filepath}': {e}")
-
-        return dataframe
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Error while loading dataset '{self.dataset_config.get_id()}'. The file '{filepath}' does not fit the schema "
+                             f"{self.CSV_SCHEMA} or the requested columns: {e}")
 
 
     def from_json(self, filepath, **kwargs):
@@ -134,7 +233,12 @@ class BaseDataset:
 
         # Attempt to load the JSON file
         try:
-            dataframe = pd.read_json(filepath, **kwargs)
+            if CompressedInput.is_compressed(filepath):
+                kwargs.setdefault("compression", None)
+                with CompressedInput.open(filepath) as source:
+                    dataframe = pd.read_json(source, **kwargs)
+            else:
+                dataframe = pd.read_json(filepath, **kwargs)
         except ValueError as e:
             raise ValueError(f"Error while loading dataset '{self.dataset_config.get_id()}'. The file '{filepath}' is not a valid JSON file: {e}")
 
@@ -143,6 +247,76 @@ class BaseDataset:
 
 
 
+    @property
+    def df(self):
+        return self._df
+
+
+    @df.setter
+    def df(self, dataframe):
+        self._df = dataframe
+        self.invalidate_indexes()       # a new dataframe: the cached indexes belong to the old one
+
+
+    def invalidate_indexes(self):
+        """
+        drops the cached indexes of self.df. called whenever self.df is replaced and by methods that change it in place
+        (decorator invalidates_indexes). changes made to self.df in place from the outside are detected when an index
+        is fetched, see get_cached_index().
+        """
+        self._indexes = {}
+
+
+    @staticmethod
+    def column_fingerprint(column):
+        """
+        returns: identity of the data behind a column - its length, dtype and the address of its numpy buffer (or the
+        id of its extension array, e.g., Arrow strings).
+        """
+        values = column.array
+        if isinstance(values, pd.Categorical):
+            data = (values.codes.__array_interface__["data"][0], id(values.categories))
+        elif isinstance(values, pd.arrays.NumpyExtensionArray):
+            data = values.to_numpy().__array_interface__["data"][0]
+        else:
+            data = id(values)
+        return len(column), column.dtype, data
+
+
+    def get_cached_index(self, key, column, build):
+        """
+        returns the cached index under key, built with build(self.df[column]) on first use and whenever the column has
+        changed. the cache keeps a reference to the indexed column: with pandas copy-on-write, any change made to the
+        column in self.df in place (e.g., df.loc[mask, col] = value, df.drop(..., inplace=True)) then writes to new
+        data, which a comparison of the column fingerprints detects without reading the column.
+        """
+        column_values = self.df[column]
+        fingerprint = self.column_fingerprint(column_values)
+        cached = self._indexes.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[2]
+        index = build(column_values)
+        self._indexes[key] = (fingerprint, column_values, index)
+        return index
+
+
+    @requires_loaded_data
+    def get_time_index(self, time_col=UNIX_TIMESTAMP_SEC):
+        """
+        returns the TimeIndex (sorted timestamps) of a Unix timestamp column of self.df, built on first use and kept with
+        the other cached indexes until self.df changes.
+        """
+        return self.get_cached_index(("time_index", time_col), time_col, TimeIndex)
+
+
+    @requires_loaded_data
+    def get_column_index(self, column):
+        """
+        returns the ColumnIndex (value -> row positions) of a column of self.df, built on first use.
+        """
+        return self.get_cached_index(column, column, ColumnIndex)
+
+
     @property
     def is_loaded(self):
         """
@@ -171,6 +345,8 @@ class BaseDataset:
             filepath (str): path to the output file
             use_taskmgr (bool): whether to execute in a separaste thread using task manager, default: False
             **kwargs: encoding, separator, quote character, quoting mode -- all the stuff for CSV files
+
+        returns: the file path, or the Future of the task with use_taskmgr
         """
         if filepath is None:
             filepath = self.dataset_config.data_output_path
@@ -197,19 +373,146 @@ class BaseDataset:
             return filepath
 
         if use_taskmgr:
-            task_mgr.submit(save_operation)  # use task manager
+            return task_mgr.submit(save_operation)  # use task manager
         else:
-            save_operation()  # run in the main thread
+            return save_operation()  # run in the main thread
+
+
+    async def save_as_csv_async(self, filepath=None, timeout=None, **kwargs):
+        """
+        coroutine: saves the dataframe to a CSV file on the task manager thread pool, see save_as_csv().
+
+        Args:
+            timeout (float): seconds to wait for the file to be written, None = no limit
+
+        returns: the file path
+        """
+        return await task_mgr.submit_async(self.save_as_csv, kwargs=dict(kwargs, filepath=filepath), timeout=timeout)
+
+
+    @requires_loaded_data
+    def save_data(self, filepath=None, use_taskmgr=False, **kwargs):
+        """
+        Save the dataframe in the output format set in the dataset config (data_output_format): csv, parquet or feather.
+
+        Args:
+            filepath (str): path to the output file (or directory, for partitioned columnar output)
+            use_taskmgr (bool): whether to execute in a separate thread using task manager, default: False
+            **kwargs: passed on to save_as_csv() / save_as_parquet() / save_as_feather()
+        """
+        writers = {
+            FORMAT_CSV: self.save_as_csv,
+            FORMAT_PARQUET: self.save_as_parquet,
+            FORMAT_FEATHER: self.save_as_feather,
+        }
+        output_format = self.dataset_config.data_output_format.lower()
+        if output_format not in writers:
+            raise ValueError(f"Dataset '{self.dataset_config.get_id()}' attempted to save in an unsupported format "
+                             f"'{self.dataset_config.data_output_format}'. Supported formats: {list(writers)}")
+        return writers[output_format](filepath=filepath, use_taskmgr=use_taskmgr, **kwargs)
+
+
+    @log_method_call
+    @requires_loaded_data
+    def save_as_parquet(self, filepath=None, use_taskmgr=False, partition_cols=None, compression=DEFAULT_PARQUET_COMPRESSION):
+        """
+        Save the dataframe to a (compressed) Parquet file. Column types are kept, categorical columns are stored dictionary encoded.
+        With partition columns, filepath is a directory with one subdirectory per partition value (col=value/, hive style).
+
+        Args:
+            filepath (str): path to the output file or directory, default: output path from the dataset config
+            use_taskmgr (bool): whether to execute in a separate thread using task manager, default: False
+            partition_cols (list): columns to partition by, default: output_partition_cols from the dataset config.
+                                   PARTITION_DAY_COL is derived from UNIX_TIMESTAMP_SEC if the dataframe does not have it.
+            compression (str): parquet compression codec, e.g., "zstd", "snappy", "gzip", None
+        """
+        return self.save_columnar(FORMAT_PARQUET, filepath, use_taskmgr, partition_cols, compression)
+
+
+    @log_method_call
+    @requires_loaded_data
+    def save_as_feather(self, filepath=None, use_taskmgr=False, partition_cols=None, compression=DEFAULT_FEATHER_COMPRESSION):
+        """
+        Save the dataframe to a Feather (Arrow IPC) file - the fastest to read back, e.g., with pd.read_feather().
+        Arguments are the same as for save_as_parquet(); compression is "lz4", "zstd" or None.
+        """
+        return self.save_columnar(FORMAT_FEATHER, filepath, use_taskmgr, partition_cols, compression)
+
+
+    def save_columnar(self, output_format, filepath, use_taskmgr, partition_cols, compression):
+        """
+        common part of save_as_parquet() and save_as_feather().
+        """
+        if pa is None:
+            raise ImportError(f"Error while saving dataset '{self.dataset_config.get_id()}'. "
+                              f"Saving as {output_format} requires pyarrow (pip install pyarrow).")
+
+        if filepath is None:
+            filepath = self.dataset_config.data_output_path
+        if partition_cols is None:
+            partition_cols = self.dataset_config.output_partition_cols or []
+
+        def save_operation():
+            with self.lock:  # Ensure thread-safe access to the dataframe
+                dataframe = self.df
+                if self.PARTITION_DAY_COL in partition_cols and self.PARTITION_DAY_COL not in dataframe.columns:
+                    dataframe = dataframe.assign(**{self.PARTITION_DAY_COL: self.timestamp_days(dataframe[self.UNIX_TIMESTAMP_SEC])})
+                missing_cols = set(partition_cols) - set(dataframe.columns)
+                if missing_cols:
+                    raise ValueError(f"Error while saving dataset '{self.dataset_config.get_id()}'. Partition columns not found: {missing_cols}")
+
+                table = pa.Table.from_pandas(dataframe, preserve_index=False)
+                try:
+                    if partition_cols:
+                        if os.path.isfile(filepath):
+                            raise ValueError(f"Error while saving dataset '{self.dataset_config.get_id()}'. "
+                                             f"The path '{filepath}' is a file, partitioned output needs a directory.")
+                        file_format = pa_dataset.ParquetFileFormat() if output_format == FORMAT_PARQUET else pa_dataset.IpcFileFormat()
+                        pa_dataset.write_dataset(table, filepath, format=file_format,
+                                                 file_options=file_format.make_write_options(compression=compression),
+                                                 partitioning=partition_cols, partitioning_flavor="hive",
+                                                 existing_data_behavior="delete_matching")
+                    elif output_format == FORMAT_PARQUET:
+                        pa_parquet.write_table(table, filepath, compression=compression)
+                    else:
+                        pa_feather.write_feather(table, filepath, compression=compression)
+                    logger.info(f"Successfully saved dataset '{self.dataset_config.get_id()}' as {output_format} to {filepath} in thread {threading.current_thread().name}.")
+                except FileNotFoundError:
+                    raise FileNotFoundError(f"Error while saving dataset '{self.dataset_config.get_id()}'. The directory for the file '{filepath}' does not exist.")
+                except PermissionError:
+                    raise PermissionError(f"Error while saving dataset '{self.dataset_config.get_id()}'. Permission denied: Unable to write to '{filepath}'.")
+
+            return filepath
+
+        if use_taskmgr:
+            return task_mgr.submit(save_operation)  # use task manager, return its Future
+        else:
+            return save_operation()  # run in the main thread
+
+
+    @staticmethod
+    def timestamp_days(timestamps):
+        """
+        converts Unix timestamps (secs) into day strings (YYYY-MM-DD), formatting every distinct day once. NaN stays NaN.
+        """
+        day_numbers = timestamps // 86400
+        codes, uniques = pd.factorize(day_numbers)
+        day_strings = pd.to_datetime(pd.Series(uniques) * 86400, unit="s").dt.strftime("%Y-%m-%d").to_numpy(dtype=object)
+        return pd.Series(np.append(day_strings, np.nan)[codes], index=timestamps.index, dtype=object)
 
 
     @requires_loaded_data                   # checks if dataframe self.df has data loaded (empty is also ok)    
-    def validate_mandatory_fields(self):
+    def validate_mandatory_fields(self, mandatory_fields=None):
         """
         Validate if mandatory column labels (as defined in dataset config) are present in self.df.
         Returns True if they are, throws a custom exception if not.
+
+        Args:
+            mandatory_fields (iterable): labels to check instead of dataset_config.mandatory_fields, default: None
         """
-        
-        missing_labels = set(self.dataset_config.mandatory_fields) - set(self.df.columns)
+        if mandatory_fields is None:
+            mandatory_fields = self.dataset_config.mandatory_fields
+        missing_labels = set(mandatory_fields) - set(self.df.columns)
 
         if missing_labels:
             raise DatasetMandatoryFieldsMissing(missing_fields=missing_labels, dataset_id=self.dataset_config.get_id())
@@ -238,6 +541,7 @@ class BaseDataset:
         pass
 
     @requires_loaded_data
+    @invalidates_indexes
     def add_load_date(self, date_col=LOAD_DATE_COL, date_format="%Y-%m-%d"):
         # updates desired column with current (load) date in specified format
         # default format is YYYY-MM-DD, default column is stored in a constant LOAD_DATE_COL
@@ -255,10 +559,13 @@ class BaseDataset:
 
 
     @requires_loaded_data
-    def add_timestamps(self, input_col, output_col, datetime_format=None, default_year=1970):
+    @invalidates_indexes
+    def add_timestamps(self, input_col, output_col, datetime_format=None, default_year=1970, infer_year_rollover=False,
+                       rollover_state=None):
         """
         adds a column (output_col) containing Unix timestamps derived from the text values in input column (input_col).
         uses datetime format set for the class, which can be overriden using datetime_format variable.
+        each distinct text value is parsed only once (log timestamps repeat a lot), and the results are mapped back to the rows.
         
         Args:
             input_column (str): Name of the column containing datetime strings.
@@ -267,10 +574,14 @@ class BaseDataset:
                                              Overrides class-level time_format if provided.
             default_year (int, optional): Default year to assign to parsed dates if year is missing in the data.
                                         Use only if you need to put the data within a specific year.
-                                        and note that your data may not cross over the change of the year.
+            infer_year_rollover (bool, optional): if the year is missing, infer the turn of the year from the order of the rows:
+                                        whenever the time jumps back by more than YEAR_ROLLOVER_SECS, the year is increased.
+                                        requires the rows to be in the (chronological) order of the source.
+            rollover_state (dict, optional): keeps the year rollover inference going across calls, when the rows come in
+                                        consecutive batches (e.g., streaming). updated in place.
             
         Caveat! If the data source lacks year, and the data crosses the turn of the year (eg, data starts in December, and ends in January next year),
-        records from January will be treated as if they were created before December.
+        records from January will be treated as if they were created before December - unless infer_year_rollover is set.
         And it may indeed be the case, e.g., if the data source provides the more recent records first.
         Also, the sort order of records in the input data may not even be sorted in any chronological order. 
         Hence, go proactive and request your sources to provide complete dates for their records. :)
@@ -292,30 +603,129 @@ class BaseDataset:
         # sometimes the input data may lack it - then we'll use some sort of default year (default_year parameter)
         contains_year = '%Y' in datetime_format_to_use or '%y' in datetime_format_to_use
 
-        # convert from string into pandas datetime format.
-        datetimes = pd.to_datetime(self.df[input_col], format=datetime_format_to_use, errors='coerce')
+        # convert the distinct values from string into pandas datetime format.
+        codes, uniques = pd.factorize(self.df[input_col])
+        datetimes = self.parse_datetimes(pd.Series(np.asarray(uniques, dtype=object), dtype=object), datetime_format_to_use)
+        valid = (codes >= 0) & np.append(datetimes.notna().to_numpy(), False)[codes]        # codes of missing values are -1
+
+        if contains_year:
+            unique_timestamps = ((datetimes - pd.Timestamp(UNIX_EPOCH_START)) // pd.Timedelta(seconds=1)).to_numpy(dtype=float, na_value=np.nan)
+            timestamps = np.append(unique_timestamps, np.nan)[codes]
+        else:
+            # pandas puts year-less dates into 1900. instead of shifting every row by a DateOffset (slow), compute the
+            # timestamps with integer arithmetic from the month, day and time of day of the distinct values.
+            unique_months = datetimes.dt.month.fillna(1).to_numpy(dtype=np.int64)
+            unique_days = datetimes.dt.day.fillna(1).to_numpy(dtype=np.int64)
+            unique_secs = ((datetimes - datetimes.dt.normalize()) // pd.Timedelta(seconds=1)).fillna(0).to_numpy(dtype=np.int64)
+            months = unique_months[codes]
+            days = unique_days[codes]
+            secs = unique_secs[codes]
 
-        if not contains_year:
-            # Shift the year vectorized for all rows where the year is 1900
-            datetimes = datetimes + pd.offsets.DateOffset(years=default_year - 1900)    # 1900 is the default year pandas uses.
+            years = np.full(len(codes), default_year, dtype=np.int64)
+            if infer_year_rollover:
+                years += self.year_rollovers(self.days_from_civil(years, months, days) * 86400 + secs, valid, rollover_state)
+            timestamps = (self.days_from_civil(years, months, days) * 86400 + secs).astype(float)
 
-        # print(datetimes.head(10))
-        timestamps = (datetimes - pd.Timestamp(UNIX_EPOCH_START)) // pd.Timedelta(seconds=1)
+        timestamps[~valid] = np.nan
+        # convert to unix timestamp (integers, unless there are rows without a valid timestamp).
+        self.df[output_col] = timestamps if np.isnan(timestamps).any() else timestamps.astype(np.int64)
 
 
-        # convert to unix timestamp.
-        self.df[output_col] = timestamps
+    TIME_OF_DAY_FORMAT = " %H:%M:%S"
+
+
+    @classmethod
+    def parse_datetimes(cls, values, datetime_format):
+        """
+        pd.to_datetime(values, format=datetime_format, errors='coerce'), faster for formats ending with the time of day
+        (e.g., syslog "%b %d %H:%M:%S"): the date parts repeat a lot and are parsed once each, the time of day is
+        calculated with string slicing and integer arithmetic. values that do not fit the layout are parsed the usual way.
+        """
+        if not datetime_format.endswith(cls.TIME_OF_DAY_FORMAT) or len(values) == 0:
+            return pd.to_datetime(values, format=datetime_format, errors='coerce')
+
+        # the strings as a 2d array of unicode code points (one row per string, zero padded), so that the slicing and the
+        # digit arithmetic run vectorized in numpy rather than string by string
+        strings = values.to_numpy(dtype=str)
+        width = strings.dtype.itemsize // 4
+        chars = strings.view(np.uint32).reshape(len(strings), width)
+        lengths = (chars != 0).sum(axis=1)
+        time_chars = chars[np.arange(len(strings))[:, None], np.maximum(lengths - 8, 0)[:, None] + np.arange(8)]     # HH:MM:SS
+        separators = chars[np.arange(len(strings)), np.maximum(lengths - 9, 0)]
+        digits = time_chars[:, [0, 1, 3, 4, 6, 7]].astype(np.int64) - ord("0")
+        hours, minutes, seconds = digits[:, 0] * 10 + digits[:, 1], digits[:, 2] * 10 + digits[:, 3], digits[:, 4] * 10 + digits[:, 5]
+        fits = ((lengths >= 9) & (separators == ord(" ")) & (time_chars[:, 2] == ord(":")) & (time_chars[:, 5] == ord(":"))
+                & ((digits >= 0) & (digits <= 9)).all(axis=1) & (hours < 24) & (minutes < 60) & (seconds < 60))
+
+        # date parts: the strings cut before the time of day
+        date_chars = np.where(np.arange(width) < (lengths - 9)[:, None], chars, 0).astype(np.uint32)
+        date_codes, date_uniques = pd.factorize(date_chars.view(f"<U{width}").ravel())
+        dates = pd.to_datetime(pd.Series(np.asarray(date_uniques, dtype=object), dtype=object),
+                               format=datetime_format[:-len(cls.TIME_OF_DAY_FORMAT)], errors='coerce')
+        fits &= dates.notna().to_numpy()[date_codes]       # e.g., extra whitespace before the time of day: leave to pandas
+        secs = np.where(fits, hours * 3600 + minutes * 60 + seconds, 0)
+
+        datetimes = pd.Series(dates.to_numpy()[date_codes] + secs.astype("timedelta64[s]"), index=values.index)
+        if not fits.all():
+            datetimes[~fits] = pd.to_datetime(values[~fits], format=datetime_format, errors='coerce')
+        return datetimes
+
+
+    @classmethod
+    def year_rollovers(cls, timestamps, valid, rollover_state=None):
+        """
+        returns the number of years to add to each row: the number of turns of the year seen so far, where a turn of the year
+        is a jump back in time by more than YEAR_ROLLOVER_SECS from the previous valid row.
+
+        Args:
+            timestamps (np.ndarray): timestamps (all in the same year), in the order of the source
+            valid (np.ndarray): boolean, False for rows without a timestamp (these do not take part)
+            rollover_state (dict, optional): {"last_timestamp": .., "years": ..} of the previous batch, updated in place
+        """
+        rollover_state = {} if rollover_state is None else rollover_state
+        valid_timestamps = timestamps[valid]
+        previous = np.concatenate(([rollover_state.get("last_timestamp", valid_timestamps[0] if len(valid_timestamps) else 0)],
+                                   valid_timestamps[:-1]))
+        valid_years = rollover_state.get("years", 0) + np.cumsum(previous - valid_timestamps > cls.YEAR_ROLLOVER_SECS)
+
+        # rows without a timestamp get the years of the previous valid row (they are NaN anyway)
+        years = np.zeros(len(timestamps), dtype=np.int64)
+        years[valid] = valid_years
+        years = np.maximum.accumulate(np.where(valid, years, 0)) if len(years) else years
+        if len(valid_timestamps):
+            rollover_state["last_timestamp"] = valid_timestamps[-1]
+            rollover_state["years"] = int(valid_years[-1])
+        return years
+
+
+    @staticmethod
+    def days_from_civil(years, months, days):
+        """
+        number of days since 1970-01-01 of (proleptic Gregorian) dates given as integer numpy arrays, vectorized.
+        """
+        years = years - (months <= 2)
+        eras = years // 400
+        year_of_era = years - eras * 400
+        day_of_year = (153 * np.where(months > 2, months - 3, months + 9) + 2) // 5 + days - 1
+        day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+        return eras * 146097 + day_of_era - 719468
 
 
 
     @requires_loaded_data
-    def search(self, search_pattern, return_col):
+    def search(self, search_pattern, return_col, use_index=None, return_type=RETURN_LIST):
         """
         Args:
             search_pattern (dict): search pattern, defined as a dictionary. 
                                     Dictionary keys are labels for columns where to search, 
-                                    values are lists of values to search for. 
+                                    values are lists of values to search for, or predicates (see QueryPlanner):
+                                    ("between", low, high), (">=", value), (">", value), ("<=", value), ("<", value),
+                                    ("prefix", text). rows must match all of them.
             return_col (str): label for the column from which to return the search results
+            use_index (bool): look the values up in per-column indexes (built on the first search of a column and kept
+                              until self.df changes) instead of scanning the columns, default: dataset_config.search_indexes
+            return_type (str): RETURN_LIST (list), RETURN_ARRAY (numpy array) or RETURN_GENERATOR (generator of the values,
+                               materialized in chunks of GENERATOR_CHUNK_ROWS)
             
         Returns:
             list: list of values from return_col for rows that match the search pattern.
@@ -330,23 +740,108 @@ class BaseDataset:
         if missing_cols:
             raise SearchColumnsMissing(missing_fields=missing_cols, dataset_id=self.get_id())
 
-        # Start with all rows
-        matching_rows = self.df
+        if return_type not in self.RETURN_TYPES:
+            raise ValueError(f"Unsupported search return type '{return_type}'. Supported return types: {self.RETURN_TYPES}")
 
-        for col, values in search_pattern.items():
-            
-            # Handle NaN values in both the column and search values
-            search_values = [np.nan if pd.isna(v) else v for v in values]
-            
-            # Match rows that satisfy the search pattern
-            matching_rows = matching_rows[
-                matching_rows[col].isin(search_values)
-            ]
+        if use_index is None:
+            use_index = self.dataset_config.search_indexes
+        planner = QueryPlanner(self.df, column_index=self.get_column_index if use_index else None)
+        positions = planner.positions(search_pattern)
 
         # Return values from return_col, handling NaNs gracefully
-        return matching_rows[return_col].dropna().tolist()
+        results = self.df[return_col].iloc[positions]
+        if return_type == self.RETURN_ARRAY:
+            return results.dropna().to_numpy()
+        if return_type == self.RETURN_GENERATOR:
+            return self.iter_values(results)
+        return results.dropna().tolist()
+
+
+    def iter_values(self, values):
+        """
+        generator of the non-missing values of a Series, converted to Python objects GENERATOR_CHUNK_ROWS at a time.
+        """
+        for start in range(0, len(values), self.GENERATOR_CHUNK_ROWS):
+            yield from values.iloc[start:start + self.GENERATOR_CHUNK_ROWS].dropna().tolist()
+
+
+    @requires_loaded_data
+    def search_many(self, search_col, keys, return_col):
+        """
+        bulk point lookups in the index of one column, e.g., the events of each of a batch of users.
+
+        Args:
+            search_col (str): label of the column to search in
+            keys (iterable): values to search for
+            return_col (str): label for the column from which to return the search results
+
+        Returns:
+            dict: key -> list of values from return_col for the rows where search_col equals the key (NaNs left out),
+                  same as search({search_col: [key]}, return_col) for every key.
+        """
+        if return_col not in self.df.columns:
+            raise KeyError(f"The column for return data '{return_col}' does not exist in the DataFrame.")
+        if search_col not in self.df.columns:
+            raise SearchColumnsMissing(missing_fields={search_col}, dataset_id=self.get_id())
+
+        index = self.get_column_index(search_col)
+        return_values = self.df[return_col]
+        has_value = return_values.notna().to_numpy()
+        keys = list(dict.fromkeys(keys))
+        found = [positions[has_value[positions]] for positions in map(index.lookup, keys)]
+
+        # one gather for all keys, then split by key
+        values = return_values.iloc[np.concatenate(found)].tolist() if found else []
+        results = {}
+        start = 0
+        for key, positions in zip(keys, found):
+            results[key] = values[start:start + len(positions)]
+            start += len(positions)
+        return results
 
     
+    @requires_loaded_data
+    def time_range(self, start=None, end=None, search_pattern=None, time_col=UNIX_TIMESTAMP_SEC):
+        """
+        returns the rows with start <= timestamp <= end (Unix seconds, None = open end), found by binary search in the
+        time index. e.g., time_range(t1, t2, {USERID_FIELD: ["root"]}) for the events of root between t1 and t2.
+
+        Args:
+            start, end (float): time range, both ends included
+            search_pattern (dict): further conditions, as for search(); equality conditions use the column indexes
+            time_col (str): column with Unix timestamps
+        """
+        positions = self.get_time_index(time_col).range(start, end)
+        if search_pattern and len(positions):
+            pattern_positions = QueryPlanner(self.df, column_index=self.get_column_index).positions(search_pattern)
+            positions = np.intersect1d(positions, pattern_positions, assume_unique=True)
+        return self.df.iloc[positions]
+
+
+    @requires_loaded_data
+    def last_events(self, secs, search_pattern=None, time_col=UNIX_TIMESTAMP_SEC):
+        """
+        returns the rows of the last secs seconds of the data (up to its latest timestamp), e.g., last_events(600,
+        {USERID_FIELD: ["root"]}) for the events of root in the last 10 minutes.
+        """
+        latest = self.get_time_index(time_col).latest()
+        if latest is None:
+            return self.df.iloc[:0]
+        return self.time_range(latest - secs, latest, search_pattern=search_pattern, time_col=time_col)
+
+
+    @requires_loaded_data
+    def event_counts(self, bucket_secs=BUCKET_MINUTE, start=None, end=None, include_empty=True, time_col=UNIX_TIMESTAMP_SEC):
+        """
+        number of rows per fixed time bucket (e.g., BUCKET_MINUTE, BUCKET_HOUR), taken from the sorted time index.
+
+        returns: Series of counts, indexed by the bucket start (Unix seconds); with include_empty also the buckets
+                 without rows between the first and the last one.
+        """
+        bucket_starts, counts = self.get_time_index(time_col).bucket_counts(bucket_secs, start, end, include_empty=include_empty)
+        return pd.Series(counts, index=pd.Index(bucket_starts, name=time_col), name="Event_Count")
+
+
     def get_id(self):
         # returns dataset id as set in dataset config.
         return self.dataset_config.get_id()
@@ -372,15 +867,28 @@ class BaseDataset:
 class DatasetConfig:
     # class to store dataset parameters
     def __init__(self, dataset_id, data_input_path, data_output_path, mandatory_fields, 
-                 data_input_format="csv", data_output_format="csv", immediately_load_data = True):
+                 data_input_format="csv", data_output_format="csv", immediately_load_data = True,
+                 parse_workers=1, follow_state_path=None, parse_engine="line", output_partition_cols=None,
+                 parse_cache_dir=None, load_columns=None, csv_chunk_rows=None, search_indexes=False,
+                 parse_cache_max_bytes=None, parse_cache_max_age_secs=None):
         
         self.dataset_id = dataset_id
-        self.data_input_path = data_input_path
+        self.data_input_path = data_input_path      # also .gz / .bz2 / .xz files or tar members: "archive.tar.gz::member"
         self.data_input_format = data_input_format
         self.data_output_path = data_output_path
         self.data_output_format = data_output_format
         self.mandatory_fields = mandatory_fields
         self.load_data = immediately_load_data
+        self.parse_workers = parse_workers          # number of processes for parsing log files, 1 = parse in the calling thread
+        self.follow_state_path = follow_state_path  # JSON file to keep the read position of followed log files between runs
+        self.parse_engine = parse_engine            # log parsing engine: "line" (line by line), "vectorized" (pandas str.extract per pattern, slower than "line") or "mmap" (bytes, in place)
+        self.output_partition_cols = output_partition_cols  # parquet / feather output: columns to partition by, e.g., ["Partition_Day", "ossh_host"]
+        self.parse_cache_dir = parse_cache_dir      # directory of the parse cache (parsed log files), None = no cache
+        self.parse_cache_max_bytes = parse_cache_max_bytes          # parse cache size limit, None = ParseCache.MAX_BYTES
+        self.parse_cache_max_age_secs = parse_cache_max_age_secs    # unused parse cache entries expire, None = ParseCache.MAX_AGE_SECS
+        self.load_columns = load_columns            # csv input: columns to load besides mandatory fields, None = all columns
+        self.csv_chunk_rows = csv_chunk_rows        # csv input: read in chunks of this many rows (large files), None = in one go
+        self.search_indexes = search_indexes        # search(): use cached per-column indexes (repeated point lookups) instead of scans
         pass
     
     def get_id(self):
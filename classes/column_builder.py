@@ -0,0 +1,178 @@
+# classes/column_builder.py
+
+# columnar dataframe builder for parsers.
+# instead of keeping one dictionary per parsed line and calling pd.DataFrame(list_of_dicts) at the end,
+# the values are appended to one list per field while parsing. rows with the same set of fields (e.g., lines parsed
+# with the same regex pattern) share their lists, so a row costs a few list appends and no per-row objects.
+# values of low-cardinality columns are encoded into integer codes as they come in (duplicate strings are dropped
+# right away), and these columns become pandas categoricals when the dataframe is built.
+# values of other repetitive columns (e.g., timestamps) can be interned: equal strings share a single object.
+# parsers that work on bytes can append the raw bytes values: with an encoding set, they are decoded when the dataframe is
+# built - categories and interned values only once per distinct value.
+from array import array
+import numpy as np
+import pandas as pd
+
+
+class ColumnBuilder:
+
+    def __init__(self, categorical_columns=(), interned_columns=(), encoding=None):
+        """
+        Args:
+            categorical_columns (iterable): labels of the columns that shall be built as pandas categoricals.
+            interned_columns (iterable): labels of the (non-categorical) columns whose equal values shall share one object.
+            encoding (str): if set, bytes values are decoded with it in to_frame(); other values are kept as they are.
+        """
+        self.encoding = encoding
+        self.categorical_codes = {label: {} for label in categorical_columns}     # label -> {value: integer code}
+        self.interned_values = {label: {} for label in interned_columns}          # label -> {value: value}
+        self.column_order = []          # columns in the order they were first seen, same as pd.DataFrame(list_of_dicts)
+        self.shapes = {}                # tuple of row keys -> (row positions, value list, code dict, intern dict per key)
+        self.num_rows = 0
+
+
+    def append(self, row):
+        """
+        appends a row given as a dictionary. the dictionary is not kept.
+        """
+        keys = tuple(row)
+        shape = self.shapes.get(keys)
+        if shape is None:
+            shape = self._add_shape(keys)
+
+        positions, columns, encoders, interners = shape
+        positions.append(self.num_rows)
+        for column, codes, interned, value in zip(columns, encoders, interners, row.values()):
+            if interned is not None:
+                value = interned.setdefault(value, value)
+            elif codes is not None:         # categorical column: store the integer code of the value
+                if value is None:
+                    value = -1
+                else:
+                    code = codes.get(value)
+                    if code is None:
+                        code = codes[value] = len(codes)
+                    value = code
+            column.append(value)
+        self.num_rows += 1
+
+
+    def _add_shape(self, keys):
+        """
+        registers a new set of row keys: storage for its values, and the new columns in first-seen order.
+        """
+        encoders = tuple(self.categorical_codes.get(key) for key in keys)
+        interners = tuple(self.interned_values.get(key) for key in keys)
+        columns = [array('q') if codes is not None else [] for codes in encoders]
+        shape = (array('q'), columns, encoders, interners)
+        self.shapes[keys] = shape
+
+        known_columns = set(self.column_order)
+        self.column_order.extend(key for key in keys if key not in known_columns)
+        return shape
+
+
+    def __len__(self):
+        return self.num_rows
+
+
+    def to_frame(self):
+        """
+        builds the dataframe. fields missing from a row are NaN, as with pd.DataFrame(list_of_dicts).
+        """
+        data = {}
+        for label in self.column_order:
+            codes = self.categorical_codes.get(label)
+            if codes is not None:
+                values = np.full(self.num_rows, -1, dtype=np.int64)
+            else:
+                values = np.full(self.num_rows, np.nan, dtype=object)
+
+            for keys, (positions, columns, _, _) in self.shapes.items():
+                if label in keys:
+                    column = columns[keys.index(label)]
+                    positions = np.frombuffer(positions, dtype=np.int64)
+                    if codes is not None:
+                        values[positions] = np.frombuffer(column, dtype=np.int64)
+                    elif self.encoding is not None:
+                        values[positions] = self._decode(column, label in self.interned_values)
+                    else:
+                        values[positions] = np.array(column, dtype=object)
+
+            if codes is not None:
+                categories = list(codes)
+                if self.encoding is not None:
+                    categories = [self._decode_value(category) for category in categories]
+                data[label] = pd.Categorical.from_codes(values, categories=categories)
+            else:
+                data[label] = pd.Series(values).infer_objects()     # same dtype inference as pd.DataFrame(list_of_dicts)
+        return pd.DataFrame(data, columns=self.column_order)
+
+
+    def _decode_value(self, value):
+        return value.decode(self.encoding) if isinstance(value, bytes) else value
+
+
+    def _decode(self, column, interned=False):
+        """
+        decodes a value list into an object array.
+        interned columns are decoded once per distinct value (equal values share one object), the other columns in one go:
+        the values are joined with NUL separators, decoded as a single string and split again.
+        """
+        if interned:
+            decoded = {value: self._decode_value(value) for value in set(column)}
+            return np.array([decoded[value] for value in column], dtype=object)
+
+        values = np.array(column, dtype=object)
+        missing = values == None                    # noqa: E711, elementwise comparison
+        try:
+            joined = b"\0".join(np.where(missing, b"", values).tolist())
+        except TypeError:                           # not only bytes (e.g., integers)
+            return np.array([self._decode_value(value) for value in column], dtype=object)
+        if joined.count(b"\0") != max(len(values) - 1, 0):      # NUL within a value
+            return np.array([self._decode_value(value) for value in column], dtype=object)
+
+        decoded = np.array(joined.decode(self.encoding).split("\0") if len(values) else [], dtype=object)
+        decoded[missing] = None
+        return decoded
+
+
+    @staticmethod
+    def concat_frames(frames, ignore_index=True):
+        """
+        concatenates dataframes built by ColumnBuilder (e.g., parsed chunks or batches) keeping the categorical columns
+        categorical: their categories are unified first, otherwise pandas falls back to object columns.
+        with ignore_index=False the row labels of the frames are kept.
+        """
+        frames = [frame for frame in frames if frame is not None]
+        if not frames:
+            return pd.DataFrame()
+
+        categorical_labels = []
+        for frame in frames:
+            for label in frame.columns:
+                if isinstance(frame[label].dtype, pd.CategoricalDtype) and label not in categorical_labels:
+                    categorical_labels.append(label)
+
+        categorical_dtypes = {}
+        if categorical_labels:
+            frames = [frame.copy(deep=False) for frame in frames]
+            for label in categorical_labels:
+                categories = pd.Index([])
+                for frame in frames:
+                    if label in frame.columns:
+                        column = frame[label]
+                        if isinstance(column.dtype, pd.CategoricalDtype):
+                            categories = categories.append(column.cat.categories)
+                        else:
+                            categories = categories.append(pd.Index(column.dropna().unique()))
+                categorical_dtypes[label] = pd.CategoricalDtype(categories.unique())
+                for frame in frames:
+                    if label in frame.columns:
+                        frame[label] = frame[label].astype(categorical_dtypes[label])
+
+        dataframe = pd.concat(frames, ignore_index=ignore_index, sort=False)
+        for label, dtype in categorical_dtypes.items():        # columns missing from some of the frames come out as object
+            if not isinstance(dataframe[label].dtype, pd.CategoricalDtype):
+                dataframe[label] = dataframe[label].astype(dtype)
+        return dataframe
@@ -0,0 +1,61 @@
+# classes/column_index.py
+
+# hash index of a dataframe column: maps every distinct value to the (ascending) row positions holding it.
+# built once with pd.factorize + a stable argsort, so that a point lookup is one dictionary lookup and an array slice
+# instead of a scan of the whole column. missing values (None, NaN, pd.NA, NaT) are indexed under one key and
+# match any missing search value - the same as Series.isin() with NaN in the search values.
+import numpy as np
+import pandas as pd
+
+
+class ColumnIndex:
+
+    def __init__(self, column):
+        """
+        Args:
+            column (pd.Series): the indexed column
+        """
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+        self.length = len(codes)
+        self.order = np.argsort(codes, kind="stable")       # row positions grouped by value, ascending within a value
+        self.bounds = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(uniques)), out=self.bounds[1:])
+
+        uniques = np.asarray(uniques, dtype=object)
+        is_missing = pd.isna(uniques)
+        self.na_code = int(np.flatnonzero(is_missing)[0]) if is_missing.any() else None
+        self.codes = {value: code for code, value in enumerate(uniques.tolist()) if not is_missing[code]}
+
+
+    def lookup(self, value):
+        """
+        returns: ascending row positions (np.ndarray) of the rows holding the value.
+        """
+        try:
+            code = self.na_code if self.is_missing(value) else self.codes.get(value)
+        except TypeError:                       # unhashable search value: matches nothing
+            code = None
+        if code is None:
+            return np.empty(0, dtype=self.order.dtype)
+        return self.order[self.bounds[code]:self.bounds[code + 1]]
+
+
+    def positions(self, values):
+        """
+        returns: ascending row positions (np.ndarray) of the rows holding any of the values.
+        """
+        found = [self.lookup(value) for value in values]
+        found = [positions for positions in found if len(positions)]
+        if not found:
+            return np.empty(0, dtype=self.order.dtype)
+        if len(found) == 1:
+            return found[0]
+        return np.unique(np.concatenate(found))             # sorted, a value listed twice counts once
+
+
+    @staticmethod
+    def is_missing(value):
+        try:
+            return bool(pd.isna(value))
+        except (TypeError, ValueError):         # list-like values are never missing
+            return False
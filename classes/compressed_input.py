@@ -0,0 +1,114 @@
+# classes/compressed_input.py
+
+# streaming input from compressed files: .gz, .bz2, .xz and members of (compressed) tar archives,
+# given as "archive.tar.gz::path/of/member". the data is decompressed on the fly while it is read, in large blocks,
+# so that rotated / archived logs can be parsed without decompressing them to disk first.
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tarfile
+from contextlib import ExitStack, contextmanager
+
+
+class CompressedInput:
+
+    MEMBER_SEPARATOR = "::"                     # "archive.tar.gz::member"
+    READ_BUFFER_SIZE = 4 * 1024 * 1024          # bytes decompressed per read
+    DECOMPRESSORS = {
+        ".gz": gzip.open,
+        ".bz2": bz2.open,
+        ".xz": lzma.open,
+    }
+
+    @classmethod
+    def split_path(cls, path):
+        """
+        returns: (path of the file, name of the tar member or None)
+        """
+        archive_path, separator, member = path.partition(cls.MEMBER_SEPARATOR)
+        return (archive_path, member) if separator else (path, None)
+
+
+    @classmethod
+    def file_path(cls, path):
+        """
+        returns the path of the file on disk (the archive for a tar member).
+        """
+        return cls.split_path(path)[0]
+
+
+    @classmethod
+    def is_compressed(cls, path):
+        """
+        checks whether the path is a tar member or a compressed file, i.e., has to be read with open() and cannot be
+        accessed randomly (seek, mmap, byte offsets).
+        """
+        file_path, member = cls.split_path(path)
+        return member is not None or os.path.splitext(file_path)[1].lower() in cls.DECOMPRESSORS
+
+
+    @classmethod
+    @contextmanager
+    def open(cls, path, mode='rb', encoding=None, buffer_size=READ_BUFFER_SIZE):
+        """
+        opens a plain or compressed file or a tar member for (sequential) reading.
+
+        Args:
+            path (str): file path, "archive.tar[.gz|.bz2|.xz]::member" for a member of a tar archive
+            mode (str): 'rb' (binary) or 'r' (text, same decoding and newline handling as the built-in open())
+            encoding (str): text mode encoding, default: as the built-in open()
+            buffer_size (int): size of the reads from the file and of the decompressed blocks
+        """
+        file_path, member = cls.split_path(path)
+        with ExitStack() as stack:
+            stream = stack.enter_context(open(file_path, 'rb', buffering=buffer_size))
+            if member is not None:
+                # the members are scanned front to back and the member is read once; seeks only skip forward
+                archive = stack.enter_context(tarfile.open(fileobj=stream, mode='r:*'))
+                stream = io.BufferedReader(cls.find_member(archive, member, file_path), buffer_size)
+            else:
+                decompressor = cls.DECOMPRESSORS.get(os.path.splitext(file_path)[1].lower())
+                if decompressor is not None:
+                    stream = io.BufferedReader(stack.enter_context(decompressor(stream, 'rb')), buffer_size)
+
+            if 'b' not in mode:
+                stream = io.TextIOWrapper(stream, encoding=encoding)
+            yield stream
+
+
+    @staticmethod
+    def find_member(archive, member, archive_path):
+        """
+        returns a (binary) file object of the member of an archive.
+        """
+        wanted = os.path.normpath(member)
+        for tarinfo in archive:
+            if os.path.normpath(tarinfo.name) == wanted:
+                if not tarinfo.isfile():
+                    raise ValueError(f"Member '{member}' of the archive '{archive_path}' is not a file.")
+                return archive.extractfile(tarinfo)
+        raise FileNotFoundError(f"The archive '{archive_path}' has no member '{member}'.")
+
+
+    @staticmethod
+    def iter_line_blocks(stream, block_size):
+        """
+        generator of blocks of about block_size bytes from a binary stream, each made of complete lines
+        (the last block may lack the final line break).
+        """
+        remainder = b""
+        while True:
+            data = stream.read(block_size)
+            if not data:
+                break
+            data = remainder + data
+            last_line_end = data.rfind(b"\n") + 1
+            if last_line_end == 0:          # no line break yet: a line longer than a block
+                remainder = data
+                continue
+            remainder = data[last_line_end:]
+            yield data[:last_line_end]
+        if remainder:
+            yield remainder
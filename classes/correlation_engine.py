@@ -0,0 +1,134 @@
+# classes/correlation_engine.py
+
+# parameter-driven temporal correlation of events: "event A followed by event B for the same key within N seconds".
+# every rule is a tuple (antecedent event types, consequent event types, join key column, window in seconds, score delta).
+# when a consequent event has an antecedent event with the same key at most window seconds before it (or at the same time),
+# both events are flagged for the rule, e.g., a successful login preceded by bruteforce events on the same user.
+#
+# all rules are evaluated in a single pass over the events in timestamp order. the engine keeps state between calls,
+# so the events can be fed in (time ordered) batches, too; state is kept per rule and key, and expires with the window.
+from collections import deque
+
+import numpy as np
+
+
+class CorrelationEngine:
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules (list): list of (antecedent event types, consequent event types, join key column, window secs, score delta)
+        """
+        self.rules = [tuple(rule) for rule in rules]
+        self.max_window = max((rule[3] for rule in self.rules), default=0)
+
+        # event type -> rules where it is an antecedent / a consequent
+        self.antecedent_rules = {}
+        self.consequent_rules = {}
+        for rule_idx, (antecedents, consequents, _, _, _) in enumerate(self.rules):
+            for event_type in antecedents:
+                self.antecedent_rules.setdefault(event_type, []).append(rule_idx)
+            for event_type in consequents:
+                self.consequent_rules.setdefault(event_type, []).append(rule_idx)
+
+        # per rule: key -> [timestamp of the latest antecedent, deque of (timestamp, row id) of antecedents not flagged yet]
+        self.state = [{} for _ in self.rules]
+        self.watermark = None           # latest timestamp processed
+        self.last_eviction = None
+
+
+    def process(self, events, event_type_col, timestamp_col):
+        """
+        correlates a batch of events. the index of the events dataframe identifies the rows in the results.
+        batches must come in timestamp order, and events with the same timestamp must not be split across batches.
+        events without a timestamp or without a join key do not take part in a rule.
+
+        returns: list (one entry per rule) of numpy arrays with the row ids flagged by the rule in this batch.
+        """
+        flagged = [[] for _ in self.rules]
+        event_types = events[event_type_col]
+        relevant = event_types.isin(list(self.antecedent_rules) + list(self.consequent_rules)) & events[timestamp_col].notna()
+        if not relevant.any():
+            return [np.array([], dtype=events.index.dtype) for _ in self.rules]
+
+        events = events[relevant.to_numpy()]
+        order = np.argsort(events[timestamp_col].to_numpy(), kind="stable")
+        timestamps = events[timestamp_col].to_numpy()[order]
+        row_ids = events.index.to_numpy()[order]
+        event_types = events[event_type_col].to_numpy()[order]
+        key_columns = {rule[2] for rule in self.rules}
+        keys = {col: events[col].to_numpy(dtype=object)[order] for col in key_columns}
+
+        # events with equal timestamps form a group: antecedents of a group are registered before its consequents
+        # are checked, so that an antecedent at the same second as a consequent counts as preceding it.
+        group_starts = np.concatenate(([0], np.flatnonzero(np.diff(timestamps)) + 1, [len(timestamps)]))
+        for start, end in zip(group_starts[:-1], group_starts[1:]):
+            for pos in range(start, end):
+                for rule_idx in self.antecedent_rules.get(event_types[pos], ()):
+                    self._add_antecedent(rule_idx, keys[self.rules[rule_idx][2]][pos], timestamps[pos], row_ids[pos])
+            for pos in range(start, end):
+                for rule_idx in self.consequent_rules.get(event_types[pos], ()):
+                    self._check_consequent(rule_idx, keys[self.rules[rule_idx][2]][pos], timestamps[pos], row_ids[pos], flagged[rule_idx])
+
+        self.watermark = timestamps[-1]
+        if self.last_eviction is None or self.watermark - self.last_eviction > self.max_window:
+            self.evict(self.watermark)
+        return [np.array(rule_flagged, dtype=row_ids.dtype) for rule_flagged in flagged]
+
+
+    @staticmethod
+    def _is_missing(key):
+        return key is None or key != key        # None or NaN
+
+
+    def _add_antecedent(self, rule_idx, key, timestamp, row_id):
+        if self._is_missing(key):
+            return
+        window = self.rules[rule_idx][3]
+        key_state = self.state[rule_idx].get(key)
+        if key_state is None:
+            key_state = self.state[rule_idx][key] = [timestamp, deque()]
+        pending = key_state[1]
+        while pending and pending[0][0] < timestamp - window:   # too old for any later consequent
+            pending.popleft()
+        pending.append((timestamp, row_id))
+        key_state[0] = timestamp
+
+
+    def _check_consequent(self, rule_idx, key, timestamp, row_id, flagged):
+        if self._is_missing(key):
+            return
+        key_state = self.state[rule_idx].get(key)
+        window = self.rules[rule_idx][3]
+        if key_state is None or timestamp - key_state[0] > window:
+            return
+        flagged.append(row_id)
+
+        # all antecedents still within the window are flagged, too (each one only once)
+        pending = key_state[1]
+        while pending:
+            antecedent_timestamp, antecedent_row_id = pending.popleft()
+            if antecedent_timestamp >= timestamp - window:
+                flagged.append(antecedent_row_id)
+
+
+    def evict(self, watermark):
+        """
+        drops the state of keys whose latest antecedent is too old to correlate with events at or after the watermark.
+        keeps memory bounded by the number of keys active within the window.
+        """
+        for rule_idx, rule_state in enumerate(self.state):
+            window = self.rules[rule_idx][3]
+            expired = [key for key, (latest_timestamp, _) in rule_state.items() if latest_timestamp < watermark - window]
+            for key in expired:
+                del rule_state[key]
+        self.last_eviction = watermark
+
+
+    def state_size(self):
+        """
+        number of keys and pending antecedents currently kept in memory.
+        """
+        keys = sum(len(rule_state) for rule_state in self.state)
+        pending = sum(len(pending) for rule_state in self.state for _, pending in rule_state.values())
+        return keys, pending
@@ -15,3 +15,21 @@ class SearchColumnsMissing(Exception):
         message = f"Dataset '{dataset_id}' The following search columns could not be found in dataset: {', '.join(missing_fields)}"
         super().__init__(message)
 
+
+class PipelineTasksFailed(Exception):
+ 
+    def __init__(self, failed_tasks, skipped_tasks=()):
+        self.failed_tasks = failed_tasks            # task name -> exception
+        self.skipped_tasks = list(skipped_tasks)    # tasks not run because a task they depend on failed
+        message = f"Pipeline tasks failed: {', '.join(f'{name} ({error})' for name, error in failed_tasks.items())}"
+        if self.skipped_tasks:
+            message += f". Skipped as a result: {', '.join(self.skipped_tasks)}"
+        super().__init__(message)
+
+
+class TaskQueueFull(Exception):
+ 
+    def __init__(self, max_queued):
+        self.max_queued = max_queued
+        message = f"Task queue is full ({max_queued} tasks waiting), task not submitted"
+        super().__init__(message)
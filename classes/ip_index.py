@@ -0,0 +1,113 @@
+# classes/ip_index.py
+
+# integer representation and range index of ip addresses (IPv4 and IPv6).
+# every address is stored as a 128 bit integer split into two uint64 halves (hi, lo); IPv4 addresses are stored as
+# IPv4-mapped IPv6 addresses (::ffff:a.b.c.d), so that IPv4 and IPv6 share one sort order and an IPv4 network is
+# a single range, too. the index keeps the row positions sorted by address: the events of an address or a network
+# (CIDR) are a contiguous slice found with two binary searches (np.searchsorted), no string hashing or scanning.
+import ipaddress
+
+import numpy as np
+import pandas as pd
+
+from classes.network_ranges import NetworkRanges
+
+
+class IPIndex:
+
+    IPV4_MAPPED_PREFIX = 0xFFFF << 32           # lo half of ::ffff:0.0.0.0
+    IPV4_MASK = 0xFFFFFFFF
+
+    def __init__(self, addresses):
+        """
+        Args:
+            addresses (pd.Series): ip address strings (possibly categorical), one per row. missing and unparseable
+                                   addresses are not indexed.
+        """
+        hi, lo, valid = self.ip_to_ints(addresses)
+        positions = np.flatnonzero(valid)
+        order = np.lexsort((lo[positions], hi[positions]))         # by hi, then lo
+        self.positions = positions[order]
+        self.hi = hi[self.positions]
+        self.lo = lo[self.positions]
+
+
+    @classmethod
+    def ip_to_ints(cls, addresses):
+        """
+        converts a Series of ip addresses into (hi, lo, valid) numpy arrays: the uint64 halves of the 128 bit
+        (IPv4-mapped for IPv4) address, and a boolean array that is False for missing and unparseable addresses.
+        each distinct address is converted only once; IPv4 addresses are converted vectorized.
+        """
+        codes, uniques = pd.factorize(addresses)
+        uniques = np.asarray(uniques, dtype=object)
+        if len(uniques) == 0:
+            return np.zeros(len(codes), dtype=np.uint64), np.zeros(len(codes), dtype=np.uint64), np.zeros(len(codes), dtype=bool)
+
+        unique_hi = np.zeros(len(uniques), dtype=np.uint64)
+        unique_lo = np.zeros(len(uniques), dtype=np.uint64)
+        unique_valid = np.zeros(len(uniques), dtype=bool)
+
+        ipv4 = NetworkRanges.ipv4_to_int(pd.Series(uniques, dtype=object))
+        is_ipv4 = ipv4 != NetworkRanges.INVALID_IP
+        unique_lo[is_ipv4] = ipv4[is_ipv4].astype(np.uint64) | np.uint64(cls.IPV4_MAPPED_PREFIX)
+        unique_valid[is_ipv4] = True
+
+        # the rest (IPv6, or not an address at all, e.g., a host name in rhost=) one by one
+        for idx in np.flatnonzero(~is_ipv4):
+            try:
+                address = int(ipaddress.IPv6Address(str(uniques[idx])))
+            except ValueError:
+                continue
+            unique_hi[idx] = address >> 64
+            unique_lo[idx] = address & 0xFFFFFFFFFFFFFFFF
+            unique_valid[idx] = True
+
+        missing = codes < 0
+        codes = np.where(missing, 0, codes)
+        return unique_hi[codes], unique_lo[codes], unique_valid[codes] & ~missing
+
+
+    @classmethod
+    def to_ipv4_uint32(cls, hi, lo, valid):
+        """
+        compact IPv4 representation of converted addresses: pandas UInt32 array, <NA> for IPv6 and invalid addresses.
+        """
+        is_ipv4 = valid & (hi == 0) & ((lo >> np.uint64(32)) == np.uint64(0xFFFF))
+        values = (lo & np.uint64(cls.IPV4_MASK)).astype(np.uint32)
+        return pd.arrays.IntegerArray(values, ~is_ipv4)
+
+
+    @classmethod
+    def network_bounds(cls, network):
+        """
+        returns the first and last address of a network (CIDR, or a single address) as ((hi, lo), (hi, lo)).
+        """
+        parsed = ipaddress.ip_network(str(network).strip(), strict=False)
+        first, last = int(parsed.network_address), int(parsed.broadcast_address)
+        if parsed.version == 4:
+            first |= cls.IPV4_MAPPED_PREFIX
+            last |= cls.IPV4_MAPPED_PREFIX
+        return (first >> 64, first & 0xFFFFFFFFFFFFFFFF), (last >> 64, last & 0xFFFFFFFFFFFFFFFF)
+
+
+    def _bound(self, hi, lo, side):
+        # binary search on hi, then on lo within the run of equal hi values
+        hi_start = np.searchsorted(self.hi, np.uint64(hi), side="left")
+        hi_end = np.searchsorted(self.hi, np.uint64(hi), side="right")
+        return hi_start + np.searchsorted(self.lo[hi_start:hi_end], np.uint64(lo), side=side)
+
+
+    def lookup(self, network):
+        """
+        returns the row positions (ascending) of the addresses in a network ("10.0.0.0/8", "2001:db8::/32")
+        or of a single address. NB, IPv6 networks covering ::ffff:0:0/96 (e.g., ::/0) include the IPv4 addresses.
+        """
+        (first_hi, first_lo), (last_hi, last_lo) = self.network_bounds(network)
+        start = self._bound(first_hi, first_lo, side="left")
+        end = self._bound(last_hi, last_lo, side="right")
+        return np.sort(self.positions[start:end])
+
+
+    def __len__(self):
+        return len(self.positions)
@@ -0,0 +1,28 @@
+# classes/json_lines_formatter.py
+
+# log formatter for structured logs: every record is written as one JSON object per line (JSON lines), so that the log
+# can be loaded with pandas.read_json(lines=True) or shipped to a log collector without parsing the text format.
+import datetime
+import json
+import logging
+
+
+class JsonLinesFormatter(logging.Formatter):
+
+    def format(self, record):
+        """
+        returns: the record as a single line JSON object.
+        """
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "module": record.module,
+            "function": record.funcName,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:             # set on the logging thread in queue mode, see StructuredQueueHandler
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
@@ -1,15 +1,32 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from classes.json_lines_formatter import JsonLinesFormatter
+from classes.structured_queue_handler import StructuredQueueHandler
 
 # basic logging functionality, uses Singleton pattern
+# by default a record is written to the log file by the thread that logs it (file I/O under the handler lock).
+# in queue mode (set_queue_mode()) the logging threads only put the records on an unbounded queue, which never blocks,
+# and a dedicated listener thread writes them to the file - logging does not stall the parsing / saving threads.
+# optional: JSON lines instead of the text format (set_json_format()), and a rate limit for high volume messages
+# (set_rate_limit()): at most max_records per call site per interval, the rest is dropped and counted. warnings and
+# errors are never dropped.
 
 class Logger:
     _instance = None  
+    TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s"
 
-    def __new__(cls, log_file="./default.log", log_level=logging.INFO):
+    def __new__(cls, log_file="./default.log", log_level=logging.INFO, queue_mode=False, json_format=False, rate_limit=None):
         if cls._instance is None:
             cls._instance = super(Logger, cls).__new__(cls)
             cls._instance._initialize_logger(log_file, log_level)
+            cls._instance.set_json_format(json_format)
+            cls._instance.set_queue_mode(queue_mode)
+            if rate_limit is not None:
+                cls._instance.set_rate_limit(*rate_limit)
         return cls._instance
 
 
@@ -21,10 +38,81 @@ class Logger:
         self.logger.setLevel(log_level)
 
         # rotating file handler - rotate log files after they reach certain size
-        handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=5)
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(module)s - %(funcName)s - %(message)s")
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
+        self.file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=5)
+        self.file_handler.setFormatter(logging.Formatter(self.TEXT_FORMAT))
+        self.logger.addHandler(self.file_handler)
+
+        self.queue_handler = None           # queue mode: handler of the logger, the listener writes to file_handler
+        self.listener = None
+        self.stop_registered = False
+        self.rate_limit = None              # (max records, per secs) per call site
+        self.rate_lock = threading.Lock()
+        self.rate_windows = {}              # (source file, line) -> [window start, records passed, records dropped]
+        self.logger.addFilter(self._rate_limit_filter)
+
+
+    def set_queue_mode(self, enabled=True):
+        """
+        writes the log records from a dedicated listener thread (True) or from the logging threads (False).
+        switching queue mode off writes out the queued records first; this is also done at exit.
+        """
+        if enabled and self.listener is None:
+            log_queue = queue.SimpleQueue()
+            self.queue_handler = StructuredQueueHandler(log_queue)
+            self.listener = QueueListener(log_queue, self.file_handler, respect_handler_level=True)
+            self.listener.start()
+            self._swap_handler(self.file_handler, self.queue_handler)
+            if not self.stop_registered:
+                atexit.register(self.set_queue_mode, False)
+                self.stop_registered = True
+        elif not enabled and self.listener is not None:
+            self._swap_handler(self.queue_handler, self.file_handler)
+            self.listener.stop()
+            self.listener, self.queue_handler = None, None
+
+
+    def _swap_handler(self, old_handler, new_handler):
+        # a new list in one assignment: a record logged meanwhile goes through exactly one of the handlers
+        self.logger.handlers = [handler for handler in self.logger.handlers if handler is not old_handler] + [new_handler]
+
+
+    def set_json_format(self, enabled=True):
+        """
+        writes the log records as JSON lines (True) or in the text format (False).
+        """
+        self.file_handler.setFormatter(JsonLinesFormatter() if enabled else logging.Formatter(self.TEXT_FORMAT))
+
+
+    def set_rate_limit(self, max_records, per_secs=1.0):
+        """
+        lets through at most max_records records below WARNING level per call site every per_secs seconds.
+        the number of dropped records is added to the next record let through. max_records None switches it off.
+        """
+        with self.rate_lock:
+            self.rate_limit = None if max_records is None else (max_records, per_secs)
+            self.rate_windows = {}
+
+
+    def _rate_limit_filter(self, record):
+        """
+        logger filter: returns False for a record to be dropped by the rate limit.
+        """
+        if self.rate_limit is None or record.levelno >= logging.WARNING:
+            return True
+        max_records, per_secs = self.rate_limit
+        key = (record.pathname, record.lineno)
+        with self.rate_lock:
+            window = self.rate_windows.get(key)
+            if window is None or record.created - window[0] >= per_secs:
+                if window is not None and window[2]:
+                    record.msg, record.args = f"{record.getMessage()} [{window[2]} similar messages dropped]", None
+                self.rate_windows[key] = [record.created, 1, 0]
+                return True
+            if window[1] < max_records:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
 
 
     @classmethod
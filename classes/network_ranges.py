@@ -0,0 +1,84 @@
+# classes/network_ranges.py
+
+# membership test of ip addresses in a set of networks (CIDR ranges), vectorized with NumPy.
+# the networks are turned into sorted, merged [first, last] integer ranges once; a column of addresses is converted
+# into integers once (distinct values only), and membership is a binary search (np.searchsorted) per address.
+import ipaddress
+
+import numpy as np
+import pandas as pd
+
+
+class NetworkRanges:
+
+    INVALID_IP = -1                 # integer value for missing or unparseable addresses
+    IPV4_REGEX = r"^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$"
+
+    def __init__(self, networks):
+        """
+        Args:
+            networks (iterable): networks in CIDR notation ("137.189.88.0/24"), single addresses ("10.0.0.1"),
+                                 or - for compatibility with the earlier prefix lists - octet prefixes ("137.189.88"
+                                 is the same as "137.189.88.0/24").
+        """
+        ranges = sorted(self.network_range(network) for network in networks)
+
+        # merge overlapping and adjacent ranges, so that a single binary search decides membership
+        merged = []
+        for first, last in ranges:
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last])
+        self.firsts = np.array([first for first, _ in merged], dtype=np.int64)
+        self.lasts = np.array([last for _, last in merged], dtype=np.int64)
+
+
+    @staticmethod
+    def network_range(network):
+        """
+        returns the (first, last) address of an IPv4 network as integers.
+        """
+        network = str(network).strip()
+        if "/" not in network and network.count(".") < 3:          # octet prefix, e.g. "137.189.88"
+            octets = [octet for octet in network.split(".") if octet]
+            network = ".".join(octets + ["0"] * (4 - len(octets))) + f"/{8 * len(octets)}"
+        parsed = ipaddress.IPv4Network(network, strict=False)
+        return int(parsed.network_address), int(parsed.broadcast_address)
+
+
+    @classmethod
+    def ipv4_to_int(cls, addresses):
+        """
+        converts a Series of IPv4 addresses (strings, possibly categorical) into an int64 array; INVALID_IP where the
+        value is missing or not an IPv4 address. each distinct address is converted only once.
+        """
+        codes, uniques = pd.factorize(addresses)
+        if len(uniques) == 0:
+            return np.full(len(codes), cls.INVALID_IP, dtype=np.int64)
+
+        octets = pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.extract(cls.IPV4_REGEX).astype(float)
+        valid = (octets.notna().all(axis=1) & (octets <= 255).all(axis=1)).to_numpy()
+        unique_ints = (octets.fillna(0).astype(np.int64) * np.array([1 << 24, 1 << 16, 1 << 8, 1])).sum(axis=1).to_numpy()
+        unique_ints = np.where(valid, unique_ints, cls.INVALID_IP)
+
+        return np.where(codes >= 0, unique_ints[codes], cls.INVALID_IP)
+
+
+    def contains_ints(self, ip_ints):
+        """
+        membership test for addresses already converted with ipv4_to_int(). returns a boolean array.
+        """
+        ip_ints = np.asarray(ip_ints, dtype=np.int64)
+        if len(self.firsts) == 0:
+            return np.zeros(len(ip_ints), dtype=bool)
+        range_idx = np.searchsorted(self.firsts, ip_ints, side="right") - 1        # last range starting at or before the address
+        in_range = (range_idx >= 0) & (ip_ints <= self.lasts[np.maximum(range_idx, 0)])
+        return in_range & (ip_ints != self.INVALID_IP)
+
+
+    def contains(self, addresses):
+        """
+        membership test for a Series of IPv4 address strings. returns a boolean array.
+        """
+        return self.contains_ints(self.ipv4_to_int(addresses))
@@ -0,0 +1,141 @@
+# classes/openssh_risk_scorer.py
+
+# online (streaming) risk scoring for OpenSSH events.
+# OpenSSHLogonData.calculate_features() needs the whole log loaded and sorted; the scorer takes batches of parsed events
+# in time order instead and emits the same scores and flags: per event features are calculated with the very same
+# dataset methods, and the correlation rules run on a CorrelationEngine that keeps sliding window state between batches.
+#
+# when rows are emitted:
+# - the events of the latest timestamp are held back until a later timestamp shows up, as the next batch may add events
+#   with the same timestamp (these count as preceding each other);
+# - events that are antecedents of a correlation rule (e.g., bruteforce events) may still be escalated by a later consequent
+#   (e.g., a successful login), so they are held back until the rule window has passed;
+# - all other events are emitted right away.
+# memory stays bounded: held back events and the correlation state cover no more than the longest rule window.
+import numpy as np
+import pandas as pd
+
+from classes.logger import Logger
+logger = Logger().get_logger()
+
+from classes.basedataset_class import DatasetConfig
+from classes.column_builder import ColumnBuilder
+from classes.correlation_engine import CorrelationEngine
+from classes.opensshlog_class import OpenSSHLogonData
+from constants import FORMAT_OPENSSH
+from constants_openssh import OSSH_EVENT_PATTERN
+
+
+class OpenSSHRiskScorer:
+
+    def __init__(self, dataset_class=OpenSSHLogonData, dataset_id="OpenSSH risk scorer"):
+        """
+        Args:
+            dataset_class (class): OpenSSHLogonData or a child class, provides the feature methods, scores and rules.
+            dataset_id (str): id of the internal dataset that is used to calculate per event features.
+        """
+        config = DatasetConfig(dataset_id=dataset_id, data_input_path=None, data_output_path=None, mandatory_fields=[],
+                               data_input_format=FORMAT_OPENSSH, immediately_load_data=False)
+        self.dataset = dataset_class(dataset_config=config)
+        self.dataset.timestamp_rollover_state = {}      # batches are consecutive parts of one log
+        self.engine = CorrelationEngine(dataset_class.CORRELATION_RULES)
+
+        # how long (secs) an event type may still be escalated by a later event: the longest window where it is an antecedent
+        self.hold_secs = {}
+        for antecedents, _, _, window, _ in self.engine.rules:
+            for event_type in antecedents:
+                self.hold_secs[event_type] = max(window, self.hold_secs.get(event_type, 0))
+
+        self.pending = None             # events of the latest timestamp, not correlated yet
+        self.unfinalized = None         # correlated events that may still be escalated
+        self.next_row_id = 0            # row ids of the events within the scorer
+        self.watermark = None           # latest timestamp correlated so far
+
+
+    def process(self, batch):
+        """
+        scores a batch of parsed events (as returned by OpenSSHLogonData.parse_log()). batches must come in time order.
+
+        returns: dataframe of the events whose scores are final, with the same columns as calculate_features() produces.
+        """
+        scored = self._score_events(batch)
+        events = ColumnBuilder.concat_frames([self.pending, scored], ignore_index=False)
+
+        timestamps = events[self.dataset.UNIX_TIMESTAMP_SEC]
+        if timestamps.notna().any():
+            latest = timestamps == timestamps.max()
+            if self.watermark is not None and timestamps.min() < self.watermark:
+                logger.warning(f"Risk scorer: batch contains events older than already processed ones, correlation may miss them.")
+        else:
+            latest = pd.Series(False, index=events.index)
+        self.pending = events[latest.to_numpy()]
+        return self._correlate(events[~latest.to_numpy()])
+
+
+    def flush(self):
+        """
+        end of input: correlates the held back events and emits everything that is left.
+        """
+        emitted = self._correlate(self.pending, final=True)
+        self.pending = None
+        return emitted
+
+
+    def state_size(self):
+        """
+        returns: dictionary with the number of held back events and the size of the correlation state.
+        """
+        keys, antecedents = self.engine.state_size()
+        return {
+            "pending_events": 0 if self.pending is None else len(self.pending),
+            "unfinalized_events": 0 if self.unfinalized is None else len(self.unfinalized),
+            "correlation_keys": keys,
+            "correlation_antecedents": antecedents,
+        }
+
+
+    def _score_events(self, batch):
+        """
+        per event features, using the dataset methods shared with calculate_features().
+        """
+        events = batch.copy()
+        events.index = pd.RangeIndex(self.next_row_id, self.next_row_id + len(events))
+        self.next_row_id += len(events)
+
+        self.dataset.df = events
+        self.dataset.calculate_event_features()
+        events = self.dataset.df
+        self.dataset.df = None
+        return events
+
+
+    def _correlate(self, events, final=False):
+        """
+        runs the correlation rules on events (complete timestamp groups), applies the escalations
+        and returns the events that can no longer change.
+        """
+        ts_col = self.dataset.UNIX_TIMESTAMP_SEC
+        score_col = self.dataset.ADJUSTED_RISK_SCORE_COL
+
+        if events is not None and len(events):
+            events = events.sort_values(by=ts_col, kind="stable")
+            self.unfinalized = ColumnBuilder.concat_frames([self.unfinalized, events], ignore_index=False)
+            flagged_per_rule = self.engine.process(events, event_type_col=OSSH_EVENT_PATTERN, timestamp_col=ts_col)
+            for (_, _, _, _, score_delta), flagged_ids in zip(self.engine.rules, flagged_per_rule):
+                self.unfinalized.loc[np.unique(flagged_ids), score_col] += score_delta
+            if events[ts_col].notna().any():
+                self.watermark = events[ts_col].max()
+
+        if self.unfinalized is None:
+            return None
+
+        # an antecedent at time t can be escalated by consequents up to t + window; later events are newer than the watermark
+        if final or self.watermark is None:
+            is_final = np.ones(len(self.unfinalized), dtype=bool)
+        else:
+            hold_until = self.unfinalized[ts_col] + self.unfinalized[OSSH_EVENT_PATTERN].map(self.hold_secs).astype(float)
+            is_final = (hold_until.isna() | (hold_until <= self.watermark)).to_numpy()
+
+        emitted = self.unfinalized[is_final].sort_values(by=ts_col, kind="stable")
+        self.unfinalized = self.unfinalized[~is_final]
+        return emitted
@@ -2,7 +2,13 @@
 
 # Basedataset child classs to load and process OpenSSH logs
 import re
-from datetime import datetime
+import io
+import os
+import json
+import hashlib
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import threading
 
@@ -14,47 +20,104 @@ from classes.task_manager import TaskManager
 task_mgr = TaskManager.get_taskmgr(max_threads=2)
 
 
-from classes.basedataset_class import BaseDataset, DatasetConfig
+from classes.basedataset_class import BaseDataset
+from classes.pattern_dispatcher import PatternDispatcher
+from classes.column_builder import ColumnBuilder
+from classes.correlation_engine import CorrelationEngine
+from classes.network_ranges import NetworkRanges
+from classes.ip_index import IPIndex
+from classes.parse_cache import ParseCache
+from classes.compressed_input import CompressedInput
 from constants import *
 from constants_openssh import *
-from decorators import requires_loaded_data, log_method_call
+from decorators import requires_loaded_data, log_method_call, invalidates_indexes
+
+def parse_log_chunk(dataset_class, path_to_logfile, start, end, engine):
+    """
+    process pool worker: parses the byte range [start, end) of the log file with dataset_class.parse_log_lines().
+    must stay a module level function, so that it can be pickled.
+    """
+    if engine == dataset_class.ENGINE_MMAP:      # all workers map the same file: one copy in the page cache, no reads
+        return dataset_class.parse_log_mmap(path_to_logfile, start, end)
+    with open(path_to_logfile, 'rb') as logfile:
+        logfile.seek(start)
+        data = logfile.read(end - start)
+    return dataset_class.parse_log_bytes(data, engine=engine)
+
+
+def parse_log_block(dataset_class, data, engine):
+    """
+    process pool worker: parses a block of complete log lines (bytes), e.g., of a decompressed stream.
+    """
+    return dataset_class.parse_log_bytes(data, engine=engine)
+
 
 class OpenSSHLogonData(BaseDataset):
 
     DEFAULT_DATE_FORMAT = "%b %d %H:%M:%S"      # date format found in ssh log file, eg, Dec 10 07:22:46
     SUPPORTED_DATA_FORMATS = ["opensshlog",]
+    CHUNKS_PER_WORKER = 4                       # parallel parsing: more chunks than workers evens out the load
+
+    # parsing engines: "line" dispatches every line to its pattern in Python,
+    # "vectorized" extracts the syslog header once and runs each pattern body once with pandas str.extract, only over the
+    # still unmatched lines whose message starts with the literal prefix of the pattern. pandas str.extract on object strings
+    # costs more per line than the dispatcher loop, so it is slower than "line" (about 0.8x, see benchmark_parse.py),
+    # "mmap" maps the file into memory and matches bytes regexes in place, decoding only the captured groups. instead of
+    # the raw log entries it keeps their byte offsets (OSSH_RAW_OFFSET, OSSH_RAW_LENGTH), see raw_entries().
+    ENGINE_LINE = "line"
+    ENGINE_VECTORIZED = "vectorized"
+    ENGINE_MMAP = "mmap"
+    PARSE_ENGINES = [ENGINE_LINE, ENGINE_VECTORIZED, ENGINE_MMAP]
+    VECTORIZED_BODY = "_body"                   # vectorized engine: helper groups, not part of the parsed fields
+    VECTORIZED_MATCHED = "_matched"
+    LOG_ENCODING = "utf-8"
+    LINE_BREAKS = re.compile(rb'\r\n|\r|\n')             # universal newlines, as with open(path, 'r')
+    ASCII_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+    FOLLOW_BATCH_BYTES = 8 * 1024 * 1024        # follow mode: size of the micro-batches appended to self.df
+    COMPRESSED_BLOCK_BYTES = 16 * 1024 * 1024   # compressed input with several workers: decompressed bytes per parsed block
+    # low-cardinality columns of the parsed log that are stored as pandas categoricals
+    CATEGORICAL_COLUMNS = [OSSH_EVENT_PATTERN, OSSH_HOST, OSSH_PROCESS, USERID_FIELD, OSSH_SRC_IP]
+    INTERNED_COLUMNS = [OSSH_TSTAMP]            # repetitive columns that stay strings, but share one object per distinct value
+    FOLLOW_FINGERPRINT_BYTES = 1024             # follow mode: the file head that is hashed to recognize a replaced file (inodes get reused)
+
+    # syslog line headers (timestamp, host, process) that the parsing patterns start with.
+    # the header is matched once per line, and only the message body is matched against the candidate patterns.
+    HEADER_PATTERNS = (
+        rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) (?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): ',
+        rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+)\s+(?P<{OSSH_HOST}>\S+)\s+(?P<{OSSH_PROCESS}>\S+):\s+',
+    )
         
     # parsing patterns acquired through ChatGPT 4o.
     PARSING_PATTERNS = {
         # ip spoofing?
         "Reverse Mapping Issue": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
-            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): reverse mapping checking .+\[(?P<{OSSH_SRC_IP}>[\d\.]+)\].+$'
+            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): reverse mapping checking .+\[(?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX})\].+$'
         ),
         # ip spoofing?
         "Reverse Mapping Check Failure": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+)\s+'
-            rf'(?P<{OSSH_HOST}>\S+)\s+(?P<{OSSH_PROCESS}>\S+):\s+Address\s+(?P<{OSSH_SRC_IP}>[\d\.]+)\s+'
+            rf'(?P<{OSSH_HOST}>\S+)\s+(?P<{OSSH_PROCESS}>\S+):\s+Address\s+(?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX})\s+'
             rf'maps\s+to\s+\S+,\s+but\s+this\s+does\s+not\s+map\s+back\s+to\s+the\s+address\s+-\s+'
             rf'POSSIBLE\s+BREAK-IN\s+ATTEMPT!$'
         ),        
         "Invalid User": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
-            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Invalid user\s+(?P<{USERID_FIELD}>\S+)\s+from\s+(?P<{OSSH_SRC_IP}>[\d\.]+)$'
+            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Invalid user\s+(?P<{USERID_FIELD}>\S+)\s+from\s+(?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX})$'
         ),        
         "Authentication Failure": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
             rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Failed password for (invalid user\s+)?(?P<{USERID_FIELD}>\S+)\s+'
-            rf'from\s+(?P<{OSSH_SRC_IP}>[\d\.]+)\s+port\s+(?P<{OSSH_PORT}>\d+)\s+ssh2$'
+            rf'from\s+(?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX})\s+port\s+(?P<{OSSH_PORT}>\d+)\s+ssh2$'
         ),
         "Successful Login": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
             rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Accepted password for (?P<{USERID_FIELD}>\S+) '
-            rf'from (?P<{OSSH_SRC_IP}>[\d\.]+) port (?P<{OSSH_PORT}>\d+).+$'
+            rf'from (?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX}) port (?P<{OSSH_PORT}>\d+).+$'
         ),
         "Disconnection": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
-            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Received disconnect from (?P<{OSSH_SRC_IP}>[\d\.]+).+$'
+            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Received disconnect from (?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX}).+$'
         ),
         # brute-force related
         "Too Many Authentication Failures": (
@@ -70,21 +133,21 @@ class OpenSSHLogonData(BaseDataset):
             rf'(?P<{OSSH_HOST}>\S+)\s+(?P<{OSSH_PROCESS}>\S+):\s+PAM\s+\d+\s+more\s+authentication\s+failure[s]?\s*;\s+'
             rf'logname=\s*(?P<{OSSH_LOGNAME}>\S*)\s*uid=\s*(?P<{OSSH_UID}>\d+)\s*'
             rf'euid=\s*(?P<{OSSH_EUID}>\d+)\s*tty=\s*(?P<{OSSH_TTY}>\S*)\s*'
-            rf'ruser=\s*(?P<{OSSH_RUSER}>\S*)\s*rhost=\s*(?P<{OSSH_SRC_IP}>[A-Za-z0-9\.\-]+)\s*'
+            rf'ruser=\s*(?P<{OSSH_RUSER}>\S*)\s*rhost=\s*(?P<{OSSH_SRC_IP}>[A-Za-z0-9\.\-:]+)\s*'
             rf'(user=\s*(?P<{USERID_FIELD}>\S+))?$'
         ),
         # ip address blocking
         "Blocked IP Address": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
-            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Blocked IP address (?P<{OSSH_SRC_IP}>[\d\.]+)$'
+            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Blocked IP address (?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX})$'
         ),        
         "Connection Reset by Peer": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
-            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Connection reset by (?P<{OSSH_SRC_IP}>[\d\.]+) \[preauth\]$'
+            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Connection reset by (?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX}) \[preauth\]$'
         ),
         "Connection Closed by Peer": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
-            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Connection closed by (?P<{OSSH_SRC_IP}>[\d\.]+) \[preauth\]$'
+            rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): Connection closed by (?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX}) \[preauth\]$'
         ),
         # possible break-in attempt alerts
         # "POSSIBLE BREAK-IN ATTEMPT": (
@@ -94,7 +157,7 @@ class OpenSSHLogonData(BaseDataset):
         # ip spoofing?
         # "Failed Reverse Mapping Check": (
         #     rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+) '
-        #     rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): reverse mapping checking .+\[(?P<{OSSH_SRC_IP}>[\d\.]+)\] failed - POSSIBLE BREAK-IN ATTEMPT!$'
+        #     rf'(?P<{OSSH_HOST}>\S+) (?P<{OSSH_PROCESS}>\S+): reverse mapping checking .+\[(?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX})\] failed - POSSIBLE BREAK-IN ATTEMPT!$'
         # ),
         # invalid authentication - usually a problem if it repeats
         "Invalid User Auth Request": (
@@ -109,13 +172,13 @@ class OpenSSHLogonData(BaseDataset):
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+)\s+'
             rf'(?P<{OSSH_HOST}>\S+)\s+(?P<{OSSH_PROCESS}>\S+):\s+pam_unix\(sshd:auth\):\s+authentication\s+failure;\s+'
             rf'logname=(?P<{OSSH_LOGNAME}>\S*)\s*uid=(?P<{OSSH_UID}>\d+)\s*euid=(?P<{OSSH_EUID}>\d+)\s*'
-            rf'tty=(?P<{OSSH_TTY}>\S*)\s*ruser=(?P<{OSSH_RUSER}>\S*)\s*rhost=(?P<{OSSH_SRC_IP}>[A-Za-z0-9\.\-]+)\s*'
+            rf'tty=(?P<{OSSH_TTY}>\S*)\s*ruser=(?P<{OSSH_RUSER}>\S*)\s*rhost=(?P<{OSSH_SRC_IP}>[A-Za-z0-9\.\-:]+)\s*'
             rf'(user=(?P<{USERID_FIELD}>\S+))?$'
         ),
         "Repeated Password Failure": (
             rf'^(?P<{OSSH_TSTAMP}>[A-Za-z]+\s+\d+\s+\d+:\d+:\d+)\s+'
             rf'(?P<{OSSH_HOST}>\S+)\s+(?P<{OSSH_PROCESS}>\S+):\s+message\s+repeated\s+\d+\s+times:\s+\[\s*'
-            rf'Failed password for (?P<{USERID_FIELD}>\S+)\s+from\s+(?P<{OSSH_SRC_IP}>[\d\.]+)\s+'
+            rf'Failed password for (?P<{USERID_FIELD}>\S+)\s+from\s+(?P<{OSSH_SRC_IP}>{OSSH_IP_ADDR_REGEX})\s+'
             rf'port\s+(?P<{OSSH_PORT}>\d+)\s+ssh2\s*\]\s*$'
         ),
         
@@ -179,16 +242,27 @@ class OpenSSHLogonData(BaseDataset):
         "Repeated Password Failure",
     ]
     
-    TRUSTED_NETWORKS = [
-        "137.189.204", "137.189.205", "137.189.206", "137.189.207",
-        "137.189.240","137.189.241", "137.189.88", "137.189.89",
-        "119.137.60", "119.137.62", "119.137.63",
+    TRUSTED_NETWORKS = [                                # CIDR ranges
+        "137.189.204.0/24", "137.189.205.0/24", "137.189.206.0/24", "137.189.207.0/24",
+        "137.189.240.0/24", "137.189.241.0/24", "137.189.88.0/24", "137.189.89.0/24",
+        "119.137.60.0/24", "119.137.62.0/24", "119.137.63.0/24",
     ]
     
     
     # risk score modifiers
     INSIDER_BRUTEFORCE_ATTEMPT = 60
     SUCCESSFUL_BRUTEFORCE = 150
+    PROBING_BEFORE_LOGIN = 50               # invalid user probing followed by a successful login from the same ip address
+    SPOOFING_BEFORE_LOGIN = 50              # reverse mapping failure followed by a successful login from the same ip address
+
+    # temporal correlation rules: "event A followed by event B for the same key within N seconds".
+    # (antecedent event types, consequent event types, join key, window in seconds, score delta)
+    # both the antecedent and the consequent events get the score delta added to the adjusted risk score (once per rule).
+    CORRELATION_RULES = [
+        (BRUTEFORCE_EVTS, SUCCESSFUL_LOGIN_EVTS, USERID_FIELD, 600, SUCCESSFUL_BRUTEFORCE),
+        (["Invalid User"], ["Successful Login"], OSSH_SRC_IP, 600, PROBING_BEFORE_LOGIN),
+        (["Reverse Mapping Issue", "Reverse Mapping Check Failure"], ["Successful Login"], OSSH_SRC_IP, 600, SPOOFING_BEFORE_LOGIN),
+    ]
          
     # various column labels
     BASE_RISK_SCORE_COL = "base_risk_score"
@@ -197,6 +271,8 @@ class OpenSSHLogonData(BaseDataset):
     BRUTEFORCE_FLAG = "Suspect_Bruteforce_Flag"                 # 1 if the event type is one that indicates a (suspected) bruteforce attack, 0 otherwise
     TRUSTED_NETWORK_FLAG = "Trusted_Network_Flag"               # 1 if the source address comes from what is defined as a trusted network, 0 otherwise
     INSIDER_BRUTEFORCE_FLAG = "Insider_Bruteforce_Flag"         # 1 if a suspected bruteforce from a trusted network, 0 otherwise
+    SOURCE_IPV4_COL = "Source_IPv4"                             # source address as uint32 (<NA> for IPv6 and missing addresses)
+    IP_INDEX_KEY = ("ip_index", OSSH_SRC_IP)                    # key of the IPIndex among the cached indexes (column labels are the others)
     
 
     def __init__(self, dataset_config: 'DatasetConfig'):
@@ -205,6 +281,7 @@ class OpenSSHLogonData(BaseDataset):
         Calls the parent constructor for shared attributes and configuration.
         """
         super().__init__(dataset_config=dataset_config)
+        self.timestamp_rollover_state = None        # {} carries the year rollover inference over consecutive batches (streaming)
 
 
     @log_method_call
@@ -229,56 +306,602 @@ class OpenSSHLogonData(BaseDataset):
                     )
 
                 # Custom parsing logic for OpenSSH logs
-                self.df = self.parse_log(self.dataset_config.get_input_path())
+                def parse_operation(path_to_logfile):
+                    return self.parse_log(path_to_logfile, workers=self.dataset_config.parse_workers, engine=self.dataset_config.parse_engine)
+
+                if self.dataset_config.parse_cache_dir:     # reuse the result of an earlier parse of the same file
+                    self.df = ParseCache(self.dataset_config.parse_cache_dir, max_bytes=self.dataset_config.parse_cache_max_bytes,
+                                         max_age_secs=self.dataset_config.parse_cache_max_age_secs).get_or_parse(
+                        self.dataset_config.get_input_path(), parse_operation,
+                        salt=self.parse_cache_salt(engine=self.dataset_config.parse_engine))
+                else:
+                    self.df = parse_operation(self.dataset_config.get_input_path())
 
                 # Validate mandatory fields after loading
                 self.validate_mandatory_fields()
+                # follow mode continues after the loaded data, not from the start of the file (see follow_log())
+                filepath = self.dataset_config.get_input_path()
+                if not CompressedInput.is_compressed(filepath):
+                    self.update_follow_state(self.dataset_config.follow_state_path, filepath, os.stat(filepath).st_ino,
+                                             os.path.getsize(filepath))
                 # print(f"OpenSSH log data loaded successfully for dataset '{self.dataset_config.get_id()}'.")
                 logger.info(f"Dataset '{self.dataset_config.get_id()}' loaded successfully from '{self.dataset_config.get_input_path()}' in thread {threading.current_thread().name}.")
 
         if use_taskmgr:
-            task_mgr.submit(load_operation)  # Asynchronous execution
+            return task_mgr.submit(load_operation)  # Asynchronous execution, return the Future
         else:
             load_operation()  # Synchronous execution
 
 
-    def validate_mandatory_fields(self):
+    def validate_mandatory_fields(self, mandatory_fields=None):
         """
         validate that mandatory fields are present using BaseDataset method.
+        with the mmap parsing engine, the raw log entries are kept as offsets: OSSH_RAW counts as present then.
+        """
+        mandatory_fields = set(self.dataset_config.mandatory_fields if mandatory_fields is None else mandatory_fields)
+        if OSSH_RAW_OFFSET in self.df.columns:
+            mandatory_fields.discard(OSSH_RAW)
+        return super().validate_mandatory_fields(mandatory_fields)
+
+
+    def save_data(self, filepath=None, use_taskmgr=False, **kwargs):
+        """
+        saves the dataframe (see BaseDataset.save_data()); raw log entries kept as offsets (mmap engine) are read first.
+        """
+        if self.df is not None and OSSH_RAW_OFFSET in self.df.columns:
+            self.add_raw_entries()
+        return super().save_data(filepath=filepath, use_taskmgr=use_taskmgr, **kwargs)
+
+
+    def raw_entries(self, rows=None):
+        """
+        returns the raw log entries of the rows as a Series (str). with the mmap parsing engine only their byte offsets are
+        kept: the entries are read from the input file, which must not have changed since parsing.
+
+        Args:
+            rows (array-like): row labels, default: all rows
+        """
+        df = self.df if rows is None else self.df.loc[rows]
+        if OSSH_RAW_OFFSET not in df.columns:
+            return df[OSSH_RAW]
+
+        raw = df[OSSH_RAW].astype(object) if OSSH_RAW in df.columns else pd.Series(None, index=df.index, dtype=object)
+        offsets = df[OSSH_RAW_OFFSET].to_numpy(dtype=float, na_value=np.nan)
+        lengths = df[OSSH_RAW_LENGTH].to_numpy(dtype=float, na_value=np.nan)
+        has_offset = ~np.isnan(offsets)             # rows added otherwise (e.g., follow mode) keep their OSSH_RAW
+        if has_offset.any():
+            with open(self.dataset_config.get_input_path(), 'rb') as logfile:
+                with mmap.mmap(logfile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    entries = [buffer[offset:offset + length].decode(self.LOG_ENCODING) for offset, length
+                               in zip(offsets[has_offset].astype(np.int64).tolist(), lengths[has_offset].astype(np.int64).tolist())]
+            raw[has_offset] = entries
+        return raw.astype("str")
+
+
+    @invalidates_indexes
+    def add_raw_entries(self):
+        """
+        replaces the raw log entry offsets (mmap parsing engine) with the raw log entries (OSSH_RAW) in self.df.
+        """
+        if OSSH_RAW_OFFSET not in self.df.columns:
+            return
+        raw = self.raw_entries()
+        position = self.df.columns.get_loc(OSSH_RAW_OFFSET)
+        self.df = self.df.drop(columns=[column for column in (OSSH_RAW, OSSH_RAW_OFFSET, OSSH_RAW_LENGTH) if column in self.df.columns])
+        self.df.insert(position, OSSH_RAW, raw)
+
+
+    @log_method_call
+    def follow_log(self, state_path=None, batch_bytes=FOLLOW_BATCH_BYTES):
+        """
+        Follow (tail) mode: parses only the lines appended to the log file since the last call (or last run, or
+        load_data(), which records the end of the loaded file) and appends them to self.df in micro-batches of about
+        batch_bytes.
+        The read position (byte offset), the inode and a hash of the head of the file are kept in self.follow_state and,
+        if a state file is given, persisted there as JSON, so that the next run continues where this one stopped.
+        If the file has been rotated (inode or head changed), the rest of the old file is read first if it can still be
+        found in the same directory under another name (e.g., SSH.log.1 after a rename by logrotate; a compressed old file
+        is not searched), then reading continues at the start of the new file. If the file has been truncated in place
+        (smaller than the offset, e.g., logrotate copytruncate), reading restarts at 0: lines written to it between the
+        last call and the truncation are lost. Lines appended while load_data() reads the file may be missed, too.
+        An incomplete last line (no line break yet) is left for the next call.
+
+        Args:
+            state_path (str): JSON file to keep the read position between runs, default: dataset_config.follow_state_path
+            batch_bytes (int): micro-batch size in bytes
+
+        returns: number of rows appended to self.df
+        """
+        filepath = self.dataset_config.get_input_path()
+        state_path = state_path if state_path else self.dataset_config.follow_state_path
+        self.validate_input_file(filepath)
+        if CompressedInput.is_compressed(filepath):
+            raise ValueError(f"Dataset '{self.get_id()}': cannot follow the compressed file '{filepath}', only plain log files grow.")
+
+        if getattr(self, "follow_state", None) is None:
+            self.follow_state = self.read_follow_state(state_path)
+
+        file_stat = os.stat(filepath)
+        offset = self.follow_state.get("offset", 0)
+        rows_appended = 0
+        if (self.follow_state.get("inode") != file_stat.st_ino
+                or self.follow_state.get("head") != self.file_fingerprint(filepath, self.follow_state.get("head_bytes", 0))):
+            if offset:
+                rotated_path = self.find_rotated_file(filepath, self.follow_state)
+                if rotated_path:
+                    logger.info(f"Dataset '{self.get_id()}': '{filepath}' has been rotated, reading the rest of '{rotated_path}' first.")
+                    rows_appended += self.read_appended_lines(rotated_path, offset, batch_bytes, state_path, final=True)[0]
+                else:
+                    logger.info(f"Dataset '{self.get_id()}': '{filepath}' has been rotated, reading from the start.")
+            offset = 0
+        elif file_stat.st_size < offset:
+            logger.info(f"Dataset '{self.get_id()}': '{filepath}' has been truncated, reading from the start.")
+            offset = 0
+
+        new_rows, offset = self.read_appended_lines(filepath, offset, batch_bytes, state_path)
+        rows_appended += new_rows
+        logger.info(f"Dataset '{self.get_id()}': {rows_appended} new log entries appended from '{filepath}' (offset {offset}).")
+        return rows_appended
+
+
+    def read_appended_lines(self, filepath, offset, batch_bytes, state_path, final=False):
+        """
+        parses the lines of a file from offset on and appends them to self.df, recording the read position after every
+        micro-batch. an incomplete last line is left for the next call, unless final (the file no longer grows).
+
+        returns: (number of rows appended, new offset)
+        """
+        inode = os.stat(filepath).st_ino
+        rows_appended = 0
+        with open(filepath, 'rb') as logfile:
+            logfile.seek(offset)
+            pending = b""
+            while True:
+                data = logfile.read(batch_bytes)
+                if not data:
+                    if not (final and pending):
+                        break
+                    data, pending = pending + b"\n", b""           # the incomplete last line of a rotated file
+                else:
+                    data = pending + data
+                last_line_end = data.rfind(b"\n") + 1
+                if last_line_end == 0:          # no complete line in this batch yet
+                    pending = data
+                    continue
+                pending = data[last_line_end:]
+
+                parsed_batch = self.parse_log_bytes(data[:last_line_end], engine=self.dataset_config.parse_engine)
+                with self.lock:
+                    self.df = parsed_batch if self.df is None else ColumnBuilder.concat_frames([self.df, parsed_batch])
+                rows_appended += len(parsed_batch)
+                offset = min(offset + last_line_end, os.path.getsize(filepath))
+                self.update_follow_state(state_path, filepath, inode, offset)
+
+        self.update_follow_state(state_path, filepath, inode, offset)
+        return rows_appended, offset
+
+
+    def find_rotated_file(self, filepath, follow_state):
+        """
+        returns: path of the file in the directory of filepath that has the inode and the head of the followed file
+        recorded in follow_state (the file renamed by a rotation), None if there is none.
+        """
+        directory = os.path.dirname(os.path.abspath(filepath))
+        for entry in os.scandir(directory):
+            try:
+                if (entry.is_file() and entry.inode() == follow_state.get("inode")
+                        and self.file_fingerprint(entry.path, follow_state.get("head_bytes", 0)) == follow_state.get("head")):
+                    return entry.path
+            except OSError:                     # removed meanwhile
+                continue
+        return None
+
+
+    def update_follow_state(self, state_path, filepath, inode, offset):
+        """
+        records the follow mode read position, together with the identity of the file it belongs to.
+        """
+        head_bytes = min(offset, self.FOLLOW_FINGERPRINT_BYTES)
+        self.follow_state = {"path": filepath, "inode": inode, "offset": offset,
+                             "head_bytes": head_bytes, "head": self.file_fingerprint(filepath, head_bytes)}
+        self.write_follow_state(state_path)
+
+
+    @staticmethod
+    def file_fingerprint(filepath, num_bytes):
+        """
+        hash of the first num_bytes of the file.
+        """
+        with open(filepath, 'rb') as file:
+            return hashlib.sha1(file.read(num_bytes)).hexdigest()
+
+
+    @staticmethod
+    def read_follow_state(state_path):
+        """
+        reads the follow mode read position from a JSON state file; an empty state if there is none.
+        """
+        if state_path and os.path.isfile(state_path):
+            with open(state_path, 'r') as state_file:
+                return json.load(state_file)
+        return {}
+
+
+    def write_follow_state(self, state_path):
+        """
+        writes the follow mode read position into a JSON state file (replaced atomically).
         """
-        super().validate_mandatory_fields()
+        if not state_path:
+            return
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, 'w') as state_file:
+            json.dump(self.follow_state, state_file)
+        os.replace(tmp_path, state_path)
 
 
     @classmethod
-    def parse_log(cls, path_to_logfile):
+    def parse_log(cls, path_to_logfile, workers=1, engine=ENGINE_LINE):
         """
         parses OpenSSH log file into a Pandas df
 
+        Args:
+            path_to_logfile (str): path to the log file
+            workers (int): number of worker processes. with more than 1 worker the file is split into newline-aligned
+                           chunks that are parsed in a process pool; the result is the same as with a single worker.
+            engine (str): parsing engine, one of PARSE_ENGINES; all produce the same result (mmap: raw entries as offsets).
+
         returns: Pandas df with parsed log entries; for each log entry the regexp pattern used is specified.
 
         """
-        
-        parsed_log_entries = []
+        if engine not in cls.PARSE_ENGINES:
+            raise ValueError(f"Unsupported parsing engine '{engine}'. Supported engines: {cls.PARSE_ENGINES}")
+
+        if CompressedInput.is_compressed(path_to_logfile):
+            return cls.parse_log_compressed(path_to_logfile, workers=workers, engine=engine)
+
+        if workers > 1:
+            chunks = cls.split_log_chunks(path_to_logfile, workers * cls.CHUNKS_PER_WORKER)
+            if len(chunks) > 1:
+                return cls.parse_log_parallel(path_to_logfile, chunks, workers, engine)
+
+        if engine == cls.ENGINE_MMAP:
+            return cls.parse_log_mmap(path_to_logfile)
+
         with open(path_to_logfile, 'r') as logfile:
-            for log_entry in logfile:
-                log_entry = log_entry.strip()                       # b/c otherwise the entries will include line breaks and output csv will look like a mess.
-                parsed_log_entry = cls.parse_log_entry(log_entry)
-                if parsed_log_entry:
-                    parsed_log_entries.append(parsed_log_entry)      
-        return pd.DataFrame(parsed_log_entries)
-    
+            return cls.parse_log_lines(logfile, engine=engine)
+
+
+    @classmethod
+    async def parse_log_async(cls, path_to_logfile, workers=1, engine=ENGINE_LINE, mode=TaskManager.MODE_THREAD, timeout=None):
+        """
+        coroutine: parses an OpenSSH log file on the task manager (see parse_log()) and returns the Pandas df.
+
+        Args:
+            mode (str): TaskManager.MODE_THREAD or TaskManager.MODE_PROCESS (CPU-bound parse off the GIL; workers=1 only,
+                        a process pool worker cannot start worker processes of its own)
+            timeout (float): seconds to wait for the result, None = no limit
+        """
+        return await task_mgr.submit_async(cls.parse_log, (path_to_logfile,), {"workers": workers, "engine": engine},
+                                           mode=mode, timeout=timeout)
+
+
+    @classmethod
+    def parse_log_compressed(cls, path_to_logfile, workers=1, engine=ENGINE_LINE):
+        """
+        parses a compressed log file (.gz, .bz2, .xz) or a member of a tar archive ("SSH.tar.gz::SSH.log"), decompressing
+        it while reading. the stream cannot be mapped or split by byte offsets: the mmap engine falls back to the line
+        engine, and with several workers the decompressed stream is cut into blocks of whole lines that are parsed
+        in a process pool while the next blocks are decompressed.
+        """
+        if engine == cls.ENGINE_MMAP:
+            logger.info(f"'{path_to_logfile}' is compressed, parsing with the '{cls.ENGINE_LINE}' engine instead of '{engine}'.")
+            engine = cls.ENGINE_LINE
+
+        if workers <= 1:
+            with CompressedInput.open(path_to_logfile, 'r') as logfile:
+                return cls.parse_log_lines(logfile, engine=engine)
+
+        parsed_blocks = []
+        with CompressedInput.open(path_to_logfile, 'rb') as logfile, ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for block in CompressedInput.iter_line_blocks(logfile, cls.COMPRESSED_BLOCK_BYTES):
+                futures.append(executor.submit(parse_log_block, cls, block, engine))
+                if len(futures) >= 2 * workers:         # bounded: at most that many decompressed blocks in memory
+                    parsed_blocks.append(futures.pop(0).result())
+            parsed_blocks.extend(future.result() for future in futures)
+        if not parsed_blocks:
+            return cls.parse_log_bytes(b"", engine=engine)
+
+        logger.info(f"Parsed '{path_to_logfile}' in {len(parsed_blocks)} blocks using {workers} worker processes.")
+        return ColumnBuilder.concat_frames(parsed_blocks)
+
+
+    @classmethod
+    def parse_log_lines(cls, log_lines, engine=ENGINE_LINE):
+        """
+        parses an iterable of log lines into a Pandas df.
+        the parsed fields are collected column by column (no list of dictionaries), CATEGORICAL_COLUMNS become categoricals.
+        """
+        if engine == cls.ENGINE_VECTORIZED:
+            return cls.parse_log_lines_vectorized(log_lines)
+
+        parsed_log_columns = ColumnBuilder(categorical_columns=cls.CATEGORICAL_COLUMNS, interned_columns=cls.INTERNED_COLUMNS)
+        for log_entry in log_lines:
+            log_entry = log_entry.strip()                       # b/c otherwise the entries will include line breaks and output csv will look like a mess.
+            parsed_log_entry = cls.parse_log_entry(log_entry)
+            if parsed_log_entry:
+                parsed_log_columns.append(parsed_log_entry)
+        return parsed_log_columns.to_frame()
+
+
+    @classmethod
+    def parse_log_lines_vectorized(cls, log_lines):
+        """
+        vectorized parsing engine: all log lines are kept in one string Series and parsed pattern by pattern, with the same
+        two stages as the pattern dispatcher: the syslog header is extracted once (per header pattern), then each pattern
+        body is extracted only from the still unmatched lines whose message starts with the literal prefix of the pattern.
+        the result is the same as with the line by line engine, but it is slower (about 0.8x of its lines/s): the regexes
+        still run once per line, plus the pandas overhead. it is not the default engine.
+        """
+        dispatcher = cls.get_pattern_dispatcher()
+        log_entries = pd.Series(list(log_lines), dtype=object).str.strip()
+        unmatched = np.ones(len(log_entries), dtype=bool)          # first match wins: matched lines drop out of the later passes
+        event_patterns = np.full(len(log_entries), UNKNOWN, dtype=object)
+        headers = {}            # header index -> (header fields, message bodies), extracted on first use from the unmatched lines
+        extracted = []          # (first row, group labels, row positions, groups) per pattern
+
+        for _, name, header_idx, prefix, body_regex in dispatcher.entries:
+            if not unmatched.any():
+                break
+            if header_idx is None:
+                header_fields, candidates = None, log_entries[unmatched]
+            else:
+                if header_idx not in headers:
+                    header_groups = log_entries[unmatched].str.extract(
+                        f"{dispatcher.header_regexes[header_idx].pattern}(?P<{cls.VECTORIZED_BODY}>(?s:.*))", expand=True)
+                    header_groups = header_groups[header_groups[cls.VECTORIZED_BODY].notna()]
+                    bodies = header_groups[cls.VECTORIZED_BODY]
+                    # the prefix tests run on an Arrow copy of the bodies (in C), the regexes on the Python strings
+                    headers[header_idx] = (header_groups.drop(columns=cls.VECTORIZED_BODY), bodies, bodies.astype("string[pyarrow]"))
+                header_fields, bodies, arrow_bodies = headers[header_idx]
+                is_candidate = unmatched[bodies.index.to_numpy()]
+                if prefix:
+                    is_candidate &= arrow_bodies.str.startswith(prefix).to_numpy(dtype=bool)
+                candidates = bodies[is_candidate]
+            if len(candidates) == 0:
+                continue
+
+            # the empty leading group tells matched lines from unmatched ones, also for patterns without (named) groups
+            groups = candidates.str.extract(f"^(?P<{cls.VECTORIZED_MATCHED}>)(?:{body_regex.pattern})", expand=True)
+            groups = groups[groups[cls.VECTORIZED_MATCHED].notna()].drop(columns=cls.VECTORIZED_MATCHED)
+            if len(groups) == 0:                # not groups.empty: a pattern without named groups leaves no columns
+                continue
+            if header_fields is not None:
+                groups = header_fields.loc[groups.index].join(groups)         # header fields first, as in the dictionary of the match
+            labels = [label for label in groups.columns if isinstance(label, str)]     # skip unnamed groups
+            positions = groups.index.to_numpy()
+            extracted.append((positions[0], labels, positions, groups))
+            unmatched[positions] = False
+            event_patterns[positions] = name
+        if unmatched.any():
+            extracted.append((np.flatnonzero(unmatched)[0], [], None, None))
+
+        # columns in the order of first appearance, like the line by line engine: pattern fields, then pattern name & raw entry
+        column_order = []
+        for _, labels, _, _ in sorted(extracted, key=lambda item: item[0]):
+            for label in labels + [OSSH_EVENT_PATTERN, OSSH_RAW]:
+                if label not in column_order:
+                    column_order.append(label)
+
+        data = {}
+        for label in column_order:
+            if label == OSSH_EVENT_PATTERN:
+                values = event_patterns
+            elif label == OSSH_RAW:
+                values = log_entries.to_numpy(dtype=object)
+            else:
+                values = np.full(len(log_entries), np.nan, dtype=object)
+                for _, labels, positions, groups in extracted:
+                    if label in labels:
+                        group_values = groups[label]
+                        values[positions] = np.where(group_values.isna(), None, group_values.to_numpy(dtype=object))   # unmatched optional group: None, as in groupdict()
+            if label in cls.CATEGORICAL_COLUMNS:
+                # categories in the order of first appearance, as ColumnBuilder builds them for the other engines
+                categories = pd.unique(values[~pd.isna(values)])
+                data[label] = pd.Categorical(values, categories=pd.Index(categories))
+            else:
+                data[label] = pd.Series(values).infer_objects()
+        return pd.DataFrame(data, columns=column_order)
+
+
+    @classmethod
+    def parse_log_bytes(cls, data, engine=ENGINE_LINE):
+        """
+        parses a block of complete log lines given as bytes into a Pandas df.
+        """
+        return cls.parse_log_lines(io.TextIOWrapper(io.BytesIO(data)), engine=engine)      # same decoding & newline handling as open(path, 'r')
+
+
+    @classmethod
+    def parse_log_mmap(cls, path_to_logfile, start=0, end=None):
+        """
+        mmap parsing engine: parses the byte range [start, end) of the log file (whole lines) in place, from a memory mapping.
+        the result has the same rows and fields as with the other engines, but OSSH_RAW is replaced with the byte offset
+        and length of the (stripped) log entry in the file: OSSH_RAW_OFFSET, OSSH_RAW_LENGTH.
+        """
+        with open(path_to_logfile, 'rb') as logfile:
+            if os.fstat(logfile.fileno()).st_size == 0:
+                return cls.parse_log_buffer(b"")
+            with mmap.mmap(logfile.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return cls.parse_log_buffer(buffer, start, end)
+
+
+    @classmethod
+    def parse_log_buffer(cls, buffer, start=0, end=None):
+        """
+        parses the log lines in buffer[start:end] (bytes or mmap) with bytes regexes, without copying or decoding the lines.
+        the offsets in the result are positions in the buffer.
+        """
+        end = len(buffer) if end is None else end
+        dispatcher = cls.get_pattern_dispatcher(bytes_mode=True)
+        parsed_log_columns = ColumnBuilder(categorical_columns=cls.CATEGORICAL_COLUMNS, interned_columns=cls.INTERNED_COLUMNS,
+                                           encoding=cls.LOG_ENCODING)
+        buffer_bytes = np.frombuffer(buffer, dtype=np.uint8)[start:end]          # no copy
+        non_ascii_positions = (np.flatnonzero((buffer_bytes >= 0x80) | ((buffer_bytes >= 0x1c) & (buffer_bytes <= 0x1f))) + start).tolist()
+        del buffer_bytes                # releases the buffer export, otherwise the mmap cannot be closed
+        non_ascii_idx = 0           # lines with non-ASCII bytes (or the separators that str.strip() treats as whitespace)
+                                    # are parsed as str, so that \s, \d and strip() give the same result as with the other engines
+        whitespace = cls.ASCII_WHITESPACE
+
+        for line_start, line_end in cls.iter_line_bounds(buffer, start, end):
+            while non_ascii_idx < len(non_ascii_positions) and non_ascii_positions[non_ascii_idx] < line_start:
+                non_ascii_idx += 1
+            if non_ascii_idx < len(non_ascii_positions) and non_ascii_positions[non_ascii_idx] < line_end:
+                parsed_log_columns.append(cls.parse_log_entry_bytes(buffer[line_start:line_end], line_start))
+                continue
+
+            # strip(), without copying the line
+            while line_start < line_end and buffer[line_start] in whitespace:
+                line_start += 1
+            while line_end > line_start and buffer[line_end - 1] in whitespace:
+                line_end -= 1
+
+            result = dispatcher.match(buffer, line_start, line_end)
+            parsed_log_entry = result[1] if result else {}
+            parsed_log_entry[OSSH_EVENT_PATTERN] = result[0] if result else UNKNOWN
+            parsed_log_entry[OSSH_RAW_OFFSET] = line_start
+            parsed_log_entry[OSSH_RAW_LENGTH] = line_end - line_start
+            parsed_log_columns.append(parsed_log_entry)
+        return parsed_log_columns.to_frame()
+
+
+    @classmethod
+    def iter_line_bounds(cls, buffer, start, end):
+        """
+        generator of the (start, end) positions of the lines in buffer[start:end], line breaks excluded.
+        """
+        if buffer.find(b"\r", start, end) < 0:       # the usual case: plain \n line breaks
+            while start < end:
+                line_end = buffer.find(b"\n", start, end)
+                if line_end < 0:
+                    yield start, end
+                    return
+                yield start, line_end
+                start = line_end + 1
+            return
+        for line_break in cls.LINE_BREAKS.finditer(buffer, start, end):
+            yield start, line_break.start()
+            start = line_break.end()
+        if start < end:
+            yield start, end
+
+
+    @classmethod
+    def parse_log_entry_bytes(cls, raw_line, offset):
+        """
+        mmap engine, lines with non-ASCII bytes: decodes the line and parses it like the line by line engine does.
+        the field values are encoded back, as the values of the other lines are bytes.
+        """
+        line = raw_line.decode(cls.LOG_ENCODING)
+        log_entry = line.strip()
+        parsed_log_entry = cls.parse_log_entry(log_entry)
+        del parsed_log_entry[OSSH_RAW]
+        for label, value in parsed_log_entry.items():
+            if isinstance(value, str) and label != OSSH_EVENT_PATTERN:
+                parsed_log_entry[label] = value.encode(cls.LOG_ENCODING)
+        parsed_log_entry[OSSH_RAW_OFFSET] = offset + len(line[:len(line) - len(line.lstrip())].encode(cls.LOG_ENCODING))
+        parsed_log_entry[OSSH_RAW_LENGTH] = len(log_entry.encode(cls.LOG_ENCODING))
+        return parsed_log_entry
+
+
+    @classmethod
+    def parse_log_parallel(cls, path_to_logfile, chunks, workers, engine=ENGINE_LINE):
+        """
+        parses the (start, end) byte ranges of the log file in a process pool.
+        the per-chunk dataframes are concatenated in the original line order.
+        """
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(parse_log_chunk, cls, path_to_logfile, start, end, engine) for start, end in chunks]
+            parsed_chunks = [future.result() for future in futures]     # keep the submission (= file) order
+
+        logger.info(f"Parsed '{path_to_logfile}' in {len(chunks)} chunks using {workers} worker processes.")
+        return ColumnBuilder.concat_frames(parsed_chunks)
+
+
+    @staticmethod
+    def split_log_chunks(path_to_logfile, num_chunks):
+        """
+        splits the file into up to num_chunks byte ranges [start, end) that begin and end at line boundaries.
+        """
+        file_size = os.path.getsize(path_to_logfile)
+        boundaries = [0]
+        with open(path_to_logfile, 'rb') as logfile:
+            for i in range(1, num_chunks):
+                offset = file_size * i // num_chunks
+                if offset <= boundaries[-1]:
+                    continue
+                logfile.seek(offset - 1)
+                logfile.readline()                      # move to the start of the next line (stays put if offset is already one)
+                if logfile.tell() >= file_size:
+                    break
+                if logfile.tell() > boundaries[-1]:
+                    boundaries.append(logfile.tell())
+        boundaries.append(file_size)
+        return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+
+    @classmethod
+    def get_pattern_dispatcher(cls, bytes_mode=False):
+        """
+        returns the precompiled pattern dispatcher for PARSING_PATTERNS, built on first use (once per class and mode).
+
+        Args:
+            bytes_mode (bool): dispatcher for bytes lines (mmap engine) instead of str lines
+        """
+        cache_attr = "_pattern_dispatcher_bytes" if bytes_mode else "_pattern_dispatcher"
+        dispatcher = cls.__dict__.get(cache_attr)
+        if dispatcher is None:
+            dispatcher = PatternDispatcher(cls.PARSING_PATTERNS, header_patterns=cls.HEADER_PATTERNS, bytes_mode=bytes_mode)
+            setattr(cls, cache_attr, dispatcher)
+        return dispatcher
+
+
+    @classmethod
+    def parse_cache_salt(cls, engine=ENGINE_LINE):
+        """
+        returns a hash of everything that determines the parsing result besides the input file: patterns, column types
+        and whether the raw log entries are kept as offsets (mmap engine).
+        part of the parse cache key, so that any change to the patterns invalidates the cached results.
+        """
+        raw_as_offsets = engine == cls.ENGINE_MMAP
+        parser_definition = json.dumps([cls.__name__, cls.HEADER_PATTERNS, cls.PARSING_PATTERNS, cls.CATEGORICAL_COLUMNS,
+                                        cls.INTERNED_COLUMNS, raw_as_offsets], sort_keys=True)
+        return hashlib.sha256(parser_definition.encode()).hexdigest()
+
+
+    @classmethod
+    def get_trusted_networks(cls):
+        """
+        returns TRUSTED_NETWORKS as NetworkRanges (sorted integer ranges), built on first use (once per class).
+        """
+        trusted_networks = cls.__dict__.get("_trusted_networks")
+        if trusted_networks is None:
+            trusted_networks = NetworkRanges(cls.TRUSTED_NETWORKS)
+            cls._trusted_networks = trusted_networks
+        return trusted_networks
+
 
     @classmethod
     def detect_pattern(cls, line):
         """
-        matches the patterns from PARSING_PATTERNS with logfile entry.
-        Returns the pattern name from PARSING_PATTERNS and match object if found, else None.
+        matches the patterns from PARSING_PATTERNS with logfile entry (first match wins, in PARSING_PATTERNS order).
+        the syslog header is parsed once, and only the patterns whose message prefix fits the line are tried.
+        Returns the pattern name from PARSING_PATTERNS and a dictionary of the named groups if found, else UNKNOWN, None.
 
         """
-        for name, pattern in cls.PARSING_PATTERNS.items():
-            match = re.match(pattern, line)
-            if match:
-                return name, match  # return pattern name & match object
+        result = cls.get_pattern_dispatcher().match(line)
+        if result:
+            return result  # return pattern name & named groups
         return UNKNOWN, None    # if there is no match, the pattern is unknown.
 
 
@@ -292,9 +915,8 @@ class OpenSSHLogonData(BaseDataset):
         it will have a None/NaN value.
         returns: dictionary based on the detected pattern.
         """
-        pattern_name, match = cls.detect_pattern(log_entry) # do pattern detection and data extraction into a regexp match object if pattern is detected.
-        if match:
-            parsed_data = match.groupdict() # this is the magic where the named groups are extracted from a match into a dictionary
+        pattern_name, parsed_data = cls.detect_pattern(log_entry) # do pattern detection and extract the named groups into a dictionary if pattern is detected.
+        if parsed_data is not None:
             parsed_data[OSSH_EVENT_PATTERN] = pattern_name  # Add the pattern name to the output
             parsed_data[OSSH_RAW] = log_entry   # add the raw log entry
             return parsed_data
@@ -324,28 +946,50 @@ class OpenSSHLogonData(BaseDataset):
         #     raise ValueError(f"Data not loaded into '{self.dataset_config.get_id()}' .")
 
 
+        # per event features and scores, then the features that depend on the sequence of events.
+        self.calculate_event_features()
+
+        self.df = self.df.sort_values(by=self.UNIX_TIMESTAMP_SEC, ascending=True).reset_index(drop=True)
+
+        # check for likely successful bruteforce attempts and other suspicious event sequences, all rules in one pass.
+        self.apply_correlation_rules(rules=self.CORRELATION_RULES, event_type_col=OSSH_EVENT_PATTERN,
+                                     event_timestamp_col=self.UNIX_TIMESTAMP_SEC, adjusted_score_col=self.ADJUSTED_RISK_SCORE_COL)
+
+
+
+
+    @requires_loaded_data
+    @invalidates_indexes
+    def calculate_event_features(self):
+        """
+        features that depend on a single event only (flags, timestamps, base and adjusted risk scores without correlation).
+        calculate_features() and the streaming OpenSSHRiskScorer share these.
+        """
         self.add_load_date()
         
         # set base risk score according to the event types
         self.calc_entry_base_score(risk_score_col=self.BASE_RISK_SCORE_COL,event_type_col=OSSH_EVENT_PATTERN)
-        self.add_timestamps(input_col=OSSH_TSTAMP, output_col=self.UNIX_TIMESTAMP_SEC)
+        # syslog timestamps lack the year: a turn of the year is inferred from the order of the log lines
+        self.add_timestamps(input_col=OSSH_TSTAMP, output_col=self.UNIX_TIMESTAMP_SEC, infer_year_rollover=True,
+                            rollover_state=self.timestamp_rollover_state)
         
         # do some feature encoding -> from strings to integers
         # set flags for successful logins and for bruteforce events - to make filtering and counting easier & faster
         self.df[self.SUCCESSFFUL_LOGIN_FLAG] = self.df[OSSH_EVENT_PATTERN].isin(self.SUCCESSFUL_LOGIN_EVTS).astype(int)
         self.df[self.BRUTEFORCE_FLAG] = self.df[OSSH_EVENT_PATTERN].isin(self.BRUTEFORCE_EVTS).astype(int)
         
+        # compact integer source address, IPv4 as uint32. integer comparisons instead of string hashing for ip based features
+        self.df[self.SOURCE_IPV4_COL] = IPIndex.to_ipv4_uint32(*IPIndex.ip_to_ints(self.df[OSSH_SRC_IP]))
+
         # flag event where source ip is from a trusted network
-        self.df[self.TRUSTED_NETWORK_FLAG] = self.df[OSSH_SRC_IP].str.startswith(tuple(self.TRUSTED_NETWORKS), na=False).astype(int)
+        source_ipv4 = self.df[self.SOURCE_IPV4_COL].astype("Int64").fillna(NetworkRanges.INVALID_IP).to_numpy(dtype=np.int64)
+        self.df[self.TRUSTED_NETWORK_FLAG] = self.get_trusted_networks().contains_ints(source_ipv4).astype(int)
 
         # identify events related to suspected bruteforce from a trusted network (there should not be any)
         self.df[self.INSIDER_BRUTEFORCE_FLAG] = ((self.df[self.BRUTEFORCE_FLAG] == 1) & (self.df[self.TRUSTED_NETWORK_FLAG] == 1)).astype(int)
-  
-       
-        self.df = self.df.sort_values(by=self.UNIX_TIMESTAMP_SEC, ascending=True).reset_index(drop=True)
 
         # in future, this should support further transparency, showing original risk score for an entry next to "adjusted risk score"
-        # which is achieved based on advanced methods like password_bruteforcing_events()
+        # which is achieved based on advanced methods like password_bruteforcing_events() / apply_correlation_rules()
         self.initialize_adjusted_risk_score(base_risk_score_col=self.BASE_RISK_SCORE_COL, adjusted_score_col=self.ADJUSTED_RISK_SCORE_COL)
 
 
@@ -355,15 +999,30 @@ class OpenSSHLogonData(BaseDataset):
         # self.df.loc[(self.df[self.BRUTEFORCE_FLAG] == 1) & (self.df[self.TRUSTED_NETWORK_FLAG] == 1), self.ADJUSTED_RISK_SCORE_COL] += self.INSIDER_BRUTEFORCE_ATTEMPT
         self.df.loc[self.df[self.INSIDER_BRUTEFORCE_FLAG] == 1, self.ADJUSTED_RISK_SCORE_COL] += self.INSIDER_BRUTEFORCE_ATTEMPT
 
-        # check for likely successful bruteforce attempts.
-        self.password_bruteforcing_events(event_timestamp_col=self.UNIX_TIMESTAMP_SEC, event_type_col=OSSH_EVENT_PATTERN,
-                                          adjusted_score_col=self.ADJUSTED_RISK_SCORE_COL, lookup_key_col=USERID_FIELD,
-                                          time_period_secs=600, success_score=self.SUCCESSFUL_BRUTEFORCE)
 
+    @requires_loaded_data
+    def get_ip_index(self):
+        """
+        returns the IPIndex of the source addresses in self.df. built on first use and kept with the other cached indexes
+        until self.df changes (see BaseDataset.invalidate_indexes()).
+        """
+        return self.get_cached_index(self.IP_INDEX_KEY, OSSH_SRC_IP, IPIndex)
+
+
+    @requires_loaded_data
+    def search_ip(self, network):
+        """
+        returns the events whose source address is the given address or belongs to the given network (CIDR),
+        IPv4 or IPv6, e.g., "137.189.88.0/24", "2001:db8::/32". uses a range lookup in the ip index.
 
+        Args:
+            network (str): ip address or network in CIDR notation
+        """
+        return self.df.iloc[self.get_ip_index().lookup(network)]
 
 
     @requires_loaded_data
+    @invalidates_indexes
     def calc_entry_base_score(self, risk_score_col, event_type_col):
         """
         adds base score for each log entry based on event type to risk score mapping in BASE_RISK_SCORES.
@@ -371,10 +1030,14 @@ class OpenSSHLogonData(BaseDataset):
         NB, base score does not consider additional factors that might increase the risk. these are prt of adjusted entry score.
         """
         
-        self.df[risk_score_col] = self.df[event_type_col].map(self.BASE_RISK_SCORE_MAP)       
+        risk_scores = self.df[event_type_col].map(self.BASE_RISK_SCORE_MAP)
+        if isinstance(risk_scores.dtype, pd.CategoricalDtype):     # categorical event types map into categorical scores
+            risk_scores = risk_scores.astype(object).infer_objects()
+        self.df[risk_score_col] = risk_scores
         return
 
     @requires_loaded_data
+    @invalidates_indexes
     def initialize_adjusted_risk_score(self, base_risk_score_col, adjusted_score_col):
         """
         initializes adjusted score column with values from base score column.
@@ -387,11 +1050,43 @@ class OpenSSHLogonData(BaseDataset):
         """
         self.df[adjusted_score_col] = self.df[base_risk_score_col]
 
+    @requires_loaded_data
+    @invalidates_indexes
+    def apply_correlation_rules(self, rules, event_type_col, event_timestamp_col, adjusted_score_col):
+        """
+        evaluates temporal correlation rules in a single pass over the events in timestamp order (see CorrelationEngine)
+        and adds each rule's score delta to the adjusted scores of the events it flags, e.g., with the rule
+        (BRUTEFORCE_EVTS, SUCCESSFUL_LOGIN_EVTS, USERID_FIELD, 600, SUCCESSFUL_BRUTEFORCE) successful logins preceded by
+        bruteforce events on the same user within 600 seconds, and those bruteforce events (see password_bruteforcing_events()).
+        NB, events with a missing join key (e.g., no user id) are never correlated. the former merge based bruteforce check
+        matched missing keys with each other, so events of unknown users could be paired with one another there.
+
+        Args:
+            rules (list): list of (antecedent event types, consequent event types, join key column, window secs, score delta)
+            event_type_col (str): column name for event types
+            event_timestamp_col (str): column name for event timestamps (Unix timestamp in seconds)
+            adjusted_score_col (str): column name for adjusted risk scores
+
+        returns: list with the number of events flagged per rule
+        """
+        engine = CorrelationEngine(rules)
+        flagged_per_rule = engine.process(self.df, event_type_col=event_type_col, timestamp_col=event_timestamp_col)
+
+        flagged_counts = []
+        for (_, _, _, _, score_delta), flagged_indexes in zip(engine.rules, flagged_per_rule):
+            flagged_indexes = np.unique(flagged_indexes)
+            self.df.loc[flagged_indexes, adjusted_score_col] += score_delta
+            flagged_counts.append(len(flagged_indexes))
+        return flagged_counts
+
+
     @requires_loaded_data
     def password_bruteforcing_events(self, event_type_col, event_timestamp_col, adjusted_score_col, lookup_key_col, time_period_secs=600, success_score=90):
         """
         validates if successful logins might be related to bruteforce attacks preceeding the login.
         increases the risk scores of successful login events if there is reason to suspect they are a result of a successful bruteforce attack.
+        evaluated by the correlation engine as the single rule
+        (BRUTEFORCE_EVTS, SUCCESSFUL_LOGIN_EVTS, lookup_key_col, time_period_secs, success_score), see apply_correlation_rules().
 
         Args:
             event_type_col (str): column name for event types
@@ -400,45 +1095,11 @@ class OpenSSHLogonData(BaseDataset):
             lookup_key_col (str): column name for user identifiers (needed to tie together bruteforce attempts and logins)
             time_period_secs (int): time period in seconds relative to a successful login events to look back for brute force attacks
             success_score (int): penalty to add to successful logins related to bruteforce attacks
-            
-        NB, this has a potential for generalization, and could be used in parameter-driven processing.
-        
-        algorithm:
-        create a temporary dataframe with all successful login events and a temporary dataframe with likely bruteforce events
-        merge both together with an inner join using user id as a key: the merged df will contain success+bruteforce pairs (row number num_success * num_bruteforce)
-        analyse each pair if success and bruteforce occurs within the defined time
-        keep original index values for rows where success and bruteforce occur close enough
-        update these rows with extra risk score   
-        """
-        # SUCCESSFUL_LOGIN_EVTS = ["Successful Login", "PAM Session Opened"]
-        # BRUTEFORCE_EVTS = ["Too Many Authentication Failures", "Repeated PAM Authentication Failures", "Repeated Password Failure"]
-
-        # filter out successful logins as well as likely brute force events
-        successful_logins = self.df[self.df[event_type_col].isin(self.SUCCESSFUL_LOGIN_EVTS)]
-        brute_force_events = self.df[self.df[event_type_col].isin(self.BRUTEFORCE_EVTS)]
-
-        # Perform a self-join on username
-        merged = pd.merge(
-            successful_logins.reset_index(),              # reset_index preserves the copies of original indices, and this can the be retrieved later on.
-            brute_force_events.reset_index(),
-            how="inner",
-            left_on=lookup_key_col,                     # lookup is on the username
-            right_on=lookup_key_col,
-            suffixes=("_success", "_bruteforce")
-        )           # rows will be produced only for users who have at least one successful login and at least one bruteforce event recorded on their userid
-        # number of rows per user: number of successful logins * number of bruteforce attempts
-
-        # Filter for brute force events within the time period preceding successful logins
-        valid_bruteforce = merged[
-            (merged[f"{event_timestamp_col}_success"] <= merged[f"{event_timestamp_col}_bruteforce"] + time_period_secs) &
-            (merged[f"{event_timestamp_col}_success"] >= merged[f"{event_timestamp_col}_bruteforce"])
-        ]
-
-        # Get the original indexes of successful login events to update
-        valid_successful_indexes = valid_bruteforce["index_success"].unique()
-        valid_bruteforce_indexes = valid_bruteforce["index_bruteforce"].unique()
-
-        # add success_score value to adjusted scores for successful logins in the original dataframe (use the original indexes):
-        self.df.loc[valid_successful_indexes, adjusted_score_col] += success_score
-        self.df.loc[valid_bruteforce_indexes, adjusted_score_col] += success_score
 
+        NB, events without a user identifier are not paired with each other (the merge based version of this method did).
+
+        returns: number of events flagged
+        """
+        rule = (self.BRUTEFORCE_EVTS, self.SUCCESSFUL_LOGIN_EVTS, lookup_key_col, time_period_secs, success_score)
+        return self.apply_correlation_rules(rules=[rule], event_type_col=event_type_col, event_timestamp_col=event_timestamp_col,
+                                            adjusted_score_col=adjusted_score_col)[0]
@@ -0,0 +1,168 @@
+# classes/parse_cache.py
+
+# content-addressed on-disk cache of parsed input files.
+# the cache key is made of the identity of the input file (size, modification time, hash of the content) and a salt
+# provided by the parser (e.g., a hash of its parsing patterns), so that a changed file or changed patterns never hit
+# an old entry. entries are parsed dataframes stored as uncompressed Arrow IPC files. when an entry is read back, every
+# Arrow column is released as soon as it has been converted (to_pandas self_destruct), so the peak memory is about the
+# dataframe plus one column.
+# the cache is bounded: entries not used for max_age_secs are removed, and if the entries take more than max_bytes,
+# the least recently used ones (by modification time, renewed on every hit) are removed, after every new entry.
+# requires pyarrow; without it, the cache is disabled and every load parses the input file.
+import hashlib
+import os
+import threading
+import time
+
+from classes.compressed_input import CompressedInput
+from classes.logger import Logger
+logger = Logger().get_logger()
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class ParseCache:
+
+    CACHE_FORMAT_VERSION = 1                # part of every key: bump when the way entries are written changes
+    HASH_BLOCK_SIZE = 1024 * 1024
+    ENTRY_SUFFIX = ".arrow"
+    MAX_BYTES = 2 * 1024 ** 3               # default size limit of all entries
+    MAX_AGE_SECS = 30 * 24 * 3600           # default: entries not used for 30 days are removed
+
+    def __init__(self, cache_dir, max_bytes=None, max_age_secs=None):
+        """
+        Args:
+            cache_dir (str): directory for the cache entries, created if it does not exist.
+            max_bytes (int): size limit of all entries, default: MAX_BYTES
+            max_age_secs (float): entries not used for this long are removed, default: MAX_AGE_SECS
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = self.MAX_BYTES if max_bytes is None else max_bytes
+        self.max_age_secs = self.MAX_AGE_SECS if max_age_secs is None else max_age_secs
+        self.enabled = pa is not None
+        if not self.enabled:
+            logger.warning(f"Parse cache '{cache_dir}' disabled: pyarrow is not installed.")
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+
+
+    def cache_key(self, filepath, salt=""):
+        """
+        returns the key of a file: a hash of its size, modification time and content, the salt and the cache format version.
+        for a member of an archive ("archive.tar.gz::member") the archive file is hashed, plus the member name.
+        """
+        archive_path, member = CompressedInput.split_path(filepath)
+        file_stat = os.stat(archive_path)
+        content_hash = hashlib.blake2b(digest_size=32)
+        with open(archive_path, 'rb') as input_file:
+            for block in iter(lambda: input_file.read(self.HASH_BLOCK_SIZE), b""):
+                content_hash.update(block)
+
+        key = hashlib.sha256()
+        key_parts = [self.CACHE_FORMAT_VERSION, file_stat.st_size, file_stat.st_mtime_ns, content_hash.hexdigest(), salt]
+        if member is not None:
+            key_parts.append(member)
+        for part in key_parts:
+            key.update(f"{part}\n".encode())
+        return key.hexdigest()
+
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key + self.ENTRY_SUFFIX)
+
+
+    def load(self, key):
+        """
+        returns the cached dataframe for the key, or None if there is no (readable) entry.
+        """
+        entry_path = self.entry_path(key)
+        if not self.enabled or not os.path.isfile(entry_path):
+            return None
+        try:
+            with pa.OSFile(entry_path, 'rb') as source:
+                table = pa.ipc.open_file(source).read_all()
+            os.utime(entry_path)                # most recently used
+        except (OSError, pa.ArrowInvalid) as e:
+            logger.warning(f"Parse cache entry '{entry_path}' could not be read, ignoring it: {e}")
+            return None
+        return table.to_pandas(split_blocks=True, self_destruct=True)      # table is unusable afterwards
+
+
+    def store(self, key, dataframe):
+        """
+        writes the dataframe as the entry for the key. the entry is written to a temporary file first and then renamed,
+        so that concurrent readers never see a partial entry.
+        """
+        if not self.enabled:
+            return
+        entry_path = self.entry_path(key)
+        tmp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            table = pa.Table.from_pandas(dataframe, preserve_index=False)
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, entry_path)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning(f"Parse cache entry '{entry_path}' could not be written: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.cleanup()
+
+
+    def cleanup(self):
+        """
+        removes the entries not used for max_age_secs, then the least recently used entries until all entries together
+        take at most max_bytes.
+        returns: number of entries removed
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(self.ENTRY_SUFFIX):
+                continue
+            try:
+                entry_stat = entry.stat()
+            except OSError:                     # removed meanwhile
+                continue
+            entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+        entries.sort()                          # least recently used first
+
+        now = time.time()
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        for last_used, size, path in entries:
+            if now - last_used <= self.max_age_secs and total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:                     # removed meanwhile, or in use (Windows)
+                pass
+            total_bytes -= size
+        if removed:
+            logger.info(f"Parse cache '{self.cache_dir}': removed {removed} old entries.")
+        return removed
+
+
+    def get_or_parse(self, filepath, parse_function, salt=""):
+        """
+        returns the parsed dataframe of the file from the cache, or parses it with parse_function(filepath) and caches it.
+        """
+        if not self.enabled:
+            return parse_function(filepath)
+
+        key = self.cache_key(filepath, salt)
+        dataframe = self.load(key)
+        if dataframe is not None:
+            logger.info(f"Parse cache hit for '{filepath}'.")
+            return dataframe
+
+        file_stat = os.stat(CompressedInput.file_path(filepath))
+        dataframe = parse_function(filepath)
+        changed_stat = os.stat(CompressedInput.file_path(filepath))
+        if (file_stat.st_size, file_stat.st_mtime_ns) == (changed_stat.st_size, changed_stat.st_mtime_ns):
+            self.store(key, dataframe)          # not when the file changed while being parsed (e.g., a growing log)
+        return dataframe
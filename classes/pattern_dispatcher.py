@@ -0,0 +1,163 @@
+# classes/pattern_dispatcher.py
+
+# two-stage regex dispatcher for log parsing.
+# stage 1: a (syslog) header regex is matched once per line and tells where the message body starts.
+# stage 2: the body is routed by its leading characters to the few patterns whose literal prefix fits,
+#          and only those precompiled body regexes are tried - in the original priority order.
+# the result is the same as trying every full pattern with re.match one by one, first match wins.
+import re
+
+
+class PatternDispatcher:
+
+    REGEX_METACHARS = set(".^$*+?{}[]|()")
+    OPTIONAL_QUANTIFIERS = set("?*{")           # quantifiers that make the preceding literal optional
+
+    def __init__(self, patterns, header_patterns=(), bytes_mode=False):
+        """
+        Args:
+            patterns (dict): pattern name -> regex string, in priority order (first match wins).
+            header_patterns (iterable): regex strings of the line headers the patterns start with.
+                                        a pattern that starts with a header string is split into header + body,
+                                        a pattern that starts with none of them is matched as a whole.
+            bytes_mode (bool): compile for bytes input (lines within a binary buffer, e.g., mmap) instead of str.
+        """
+        self.bytes_mode = bytes_mode
+        self.pattern_names = list(patterns.keys())
+        self.header_regexes = [self._compile(header) for header in header_patterns]
+        self._candidate_cache = {}              # (first body char per header) -> candidate list
+
+        # every entry: (priority, pattern name, header index or None, literal prefix, compiled body regex)
+        self.entries = []
+        for priority, (name, pattern) in enumerate(patterns.items()):
+            header_idx, body = None, pattern
+            for idx, header in enumerate(header_patterns):
+                if pattern.startswith(header):
+                    header_idx, body = idx, pattern[len(header):]
+                    break
+            prefix = self.literal_prefix(body) if header_idx is not None else ""
+            if self.bytes_mode:
+                prefix = prefix.encode()
+            self.entries.append((priority, name, header_idx, prefix, self._compile(body)))
+
+
+    def _compile(self, regex):
+        if self.bytes_mode:
+            # lines are matched in place within the buffer (match(buffer, pos, endpos)), where '^' would not match at pos.
+            # match() is anchored at pos anyway.
+            return re.compile(regex[1:].encode() if regex.startswith("^") else regex.encode())
+        return re.compile(regex)
+
+
+    @classmethod
+    def literal_prefix(cls, regex):
+        """
+        returns the literal text every match of the regex has to start with, e.g. 'Failed password for ' for
+        'Failed password for (invalid user\\s+)?...'. returns an empty string if the regex starts with a non-literal.
+        """
+        if cls._has_toplevel_alternation(regex):
+            return ""
+
+        prefix = []
+        i = 0
+        while i < len(regex):
+            char = regex[i]
+            if char == "\\":
+                if i + 1 >= len(regex) or regex[i + 1].isalnum():     # \s, \d, \S, ... are character classes, not literals
+                    break
+                literal, step = regex[i + 1], 2
+            elif char in cls.REGEX_METACHARS:
+                break
+            else:
+                literal, step = char, 1
+            if i + step < len(regex) and regex[i + step] in cls.OPTIONAL_QUANTIFIERS:
+                break                               # the literal may be missing from the match
+            prefix.append(literal)
+            i += step
+        return "".join(prefix)
+
+
+    @staticmethod
+    def _has_toplevel_alternation(regex):
+        """
+        checks for a '|' outside of groups and character classes - then there is no single common prefix.
+        """
+        depth = 0
+        in_class = False
+        i = 0
+        while i < len(regex):
+            char = regex[i]
+            if char == "\\":
+                i += 2
+                continue
+            if in_class:
+                in_class = char != "]"
+            elif char == "[":
+                in_class = True
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif char == "|" and depth == 0:
+                return True
+            i += 1
+        return False
+
+
+    def _candidates(self, first_chars):
+        """
+        candidate entries (in priority order) for a line, given the first body character for each header
+        (None where the header did not match). cached, because the number of distinct keys is small.
+        """
+        candidates = self._candidate_cache.get(first_chars)
+        if candidates is None:
+            candidates = []
+            for entry in self.entries:
+                header_idx, prefix = entry[2], entry[3]
+                if header_idx is None:
+                    candidates.append(entry)
+                elif first_chars[header_idx] is not None and (not prefix or prefix[:1] == first_chars[header_idx]):
+                    candidates.append(entry)
+            self._candidate_cache[first_chars] = candidates
+        return candidates
+
+
+    def match(self, line, pos=0, endpos=None):
+        """
+        finds the first pattern (in priority order) that matches the line.
+        in bytes mode the line can be a slice [pos, endpos) of a larger buffer (bytes, mmap), so that it is not copied.
+        returns: (pattern name, dictionary of named groups) or None if no pattern matches.
+        """
+        if endpos is None:
+            endpos = len(line)
+        header_matches = []
+        body_starts = []
+        first_chars = []
+        for header_regex in self.header_regexes:
+            header_match = header_regex.match(line, pos, endpos)
+            header_matches.append(header_match)
+            if header_match:
+                start = header_match.end()
+                body_starts.append(start)
+                first_chars.append(line[start:min(start + 1, endpos)])
+            else:
+                body_starts.append(None)
+                first_chars.append(None)
+
+        for _, name, header_idx, prefix, body_regex in self._candidates(tuple(first_chars)):
+            if header_idx is None:
+                match = body_regex.match(line, pos, endpos)
+                if match:
+                    return name, match.groupdict()
+                continue
+
+            start = body_starts[header_idx]
+            if prefix and line[start:start + len(prefix)] != prefix:      # also works for mmap, which has no startswith()
+                continue
+            match = body_regex.match(line, start, endpos)
+            if match:
+                fields = header_matches[header_idx].groupdict()
+                fields.update(match.groupdict())
+                return name, fields
+
+        return None
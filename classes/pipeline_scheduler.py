@@ -0,0 +1,193 @@
+# classes/pipeline_scheduler.py
+
+# dependency-aware task scheduler on top of TaskManager.
+# the work is described as a DAG of named tasks: a task is submitted to the task manager as soon as all the tasks it
+# depends on have completed, instead of waiting at global wait_for_all() barriers. independent chains (e.g., the
+# load -> cleanup -> features -> save steps of different datasets) run concurrently, and the end-to-end time becomes
+# the longest chain (critical path) instead of the sum of the slowest task of every stage.
+# if a task fails, the tasks that depend on it are skipped; all other tasks still run.
+import threading
+import time
+from concurrent.futures import Future
+
+from classes.logger import Logger
+logger = Logger().get_logger()
+
+from classes.task_manager import TaskManager
+from classes.custom_exceptions import PipelineTasksFailed
+
+
+class PipelineScheduler:
+
+    def __init__(self, task_mgr=None):
+        """
+        Args:
+            task_mgr (TaskManager): task manager that runs the tasks, default: the task manager singleton
+        """
+        self.task_mgr = task_mgr if task_mgr is not None else TaskManager.get_taskmgr()
+        self.tasks = {}                 # name -> (fn, args, kwargs, dependencies, mode), in the order added
+        self.results = {}               # name -> result of the completed tasks
+        self.timings = {}               # name -> (start, end) as time.perf_counter() values
+
+
+    def add_task(self, name, fn, /, *args, depends_on=(), mode=TaskManager.MODE_THREAD, **kwargs):
+        """
+        adds a task fn(*args, **kwargs) to the pipeline.
+
+        Args:
+            name (str): unique task name, used in depends_on of other tasks
+            depends_on (iterable): names of the tasks that must complete first
+            mode (str): TaskManager.MODE_THREAD (default; tasks that update datasets or do I/O) or TaskManager.MODE_PROCESS
+                        (CPU-bound tasks with picklable functions, arguments and results)
+
+        returns: the task name
+        """
+        if name in self.tasks:
+            raise ValueError(f"Pipeline task '{name}' has already been added.")
+        self.tasks[name] = (fn, args, kwargs, list(depends_on), mode)
+        return name
+
+
+    def add_chain(self, steps, depends_on=()):
+        """
+        adds tasks that run one after another, e.g., the processing steps of a dataset.
+
+        Args:
+            steps (list): (name, fn) or (name, fn, kwargs) tuples, in the order to run
+            depends_on (iterable): names of the tasks the first step depends on
+
+        returns: the name of the last step, to make other tasks depend on the whole chain
+        """
+        previous = list(depends_on)
+        for step in steps:
+            name, fn = step[0], step[1]
+            kwargs = step[2] if len(step) > 2 else {}
+            self.add_task(name, fn, depends_on=previous, **kwargs)
+            previous = [name]
+        return previous[0] if previous else None
+
+
+    def validate(self):
+        """
+        checks that all dependencies exist and that there are no cycles.
+        returns: task names in a topological order.
+        """
+        dependents = {name: [] for name in self.tasks}
+        pending = {}
+        for name, (_, _, _, dependencies, _) in self.tasks.items():
+            unknown = [dependency for dependency in dependencies if dependency not in self.tasks]
+            if unknown:
+                raise ValueError(f"Pipeline task '{name}' depends on unknown tasks: {unknown}")
+            pending[name] = len(dependencies)
+            for dependency in dependencies:
+                dependents[dependency].append(name)
+
+        order = [name for name, count in pending.items() if count == 0]
+        for name in order:              # order grows while it is iterated (Kahn's algorithm)
+            for dependent in dependents[name]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    order.append(dependent)
+        if len(order) < len(self.tasks):
+            raise ValueError(f"Pipeline has a dependency cycle among: {[name for name in self.tasks if name not in order]}")
+        return order
+
+
+    def run(self):
+        """
+        runs all tasks, each as soon as its dependencies have completed, and waits until the pipeline is done.
+
+        returns: dictionary task name -> result
+        raises: PipelineTasksFailed if any task failed (after all tasks that could run have completed)
+        """
+        self.validate()
+        self.results, self.timings = {}, {}
+        failed, skipped = {}, []
+        pending = {name: len(task[3]) for name, task in self.tasks.items()}
+        dependents = {name: [] for name in self.tasks}
+        for name, task in self.tasks.items():
+            for dependency in task[3]:
+                dependents[dependency].append(name)
+
+        remaining = len(self.tasks)
+        done = threading.Condition()
+        pipeline_start = time.perf_counter()
+
+        def start(name):
+            fn, args, kwargs, _, mode = self.tasks[name]
+            start_time = time.perf_counter()
+
+            def timed_task(*args, **kwargs):         # thread mode: the time the task runs, not the time it waits in the queue
+                nonlocal start_time
+                start_time = time.perf_counter()
+                return fn(*args, **kwargs)
+
+            task_fn = timed_task if mode == TaskManager.MODE_THREAD else fn
+            try:
+                future = self.task_mgr.submit_mode(mode, task_fn, *args, **kwargs)
+            except Exception as e:          # e.g., unpicklable process task: fails like the task itself
+                future = Future()
+                future.set_exception(e)
+            future.add_done_callback(lambda future: finish(name, future, start_time))
+
+        def skip(name):
+            # a task this one depends on failed: skip it and everything downstream
+            nonlocal remaining
+            skipped.append(name)
+            remaining -= 1
+            for dependent in dependents[name]:
+                if pending[dependent] >= 0:
+                    pending[dependent] = -1
+                    skip(dependent)
+
+        def finish(name, future, start_time):
+            nonlocal remaining
+            ready = []
+            with done:
+                self.timings[name] = (start_time, time.perf_counter())
+                remaining -= 1
+                try:
+                    self.results[name] = future.result()
+                    logger.info(f"Pipeline task '{name}' completed in {self.timings[name][1] - start_time:.3f} s.")
+                    for dependent in dependents[name]:
+                        pending[dependent] -= 1
+                        if pending[dependent] == 0:
+                            ready.append(dependent)
+                except BaseException as e:      # e.g., SystemExit in a task: its dependents must still be skipped
+                    failed[name] = e
+                    logger.error(f"Pipeline task '{name}' failed: {e}")
+                    for dependent in dependents[name]:
+                        if pending[dependent] >= 0:
+                            pending[dependent] = -1
+                            skip(dependent)
+                done.notify_all()
+            for dependent in ready:         # outside the lock: a task may complete (and call finish) right away
+                start(dependent)
+
+        initial = [name for name, count in pending.items() if count == 0]
+        for name in initial:
+            start(name)
+
+        with done:
+            done.wait_for(lambda: remaining == 0)
+
+        logger.info(f"Pipeline of {len(self.tasks)} tasks completed in {time.perf_counter() - pipeline_start:.3f} s, "
+                    f"critical path: {' -> '.join(self.critical_path())}.")
+        if failed:
+            raise PipelineTasksFailed(failed, skipped)
+        return self.results
+
+
+    def critical_path(self):
+        """
+        returns: the chain of completed tasks that ended last, following for each task the dependency that finished last.
+        """
+        if not self.timings:
+            return []
+        path = [max(self.timings, key=lambda name: self.timings[name][1])]
+        while True:
+            dependencies = [dependency for dependency in self.tasks[path[-1]][3] if dependency in self.timings]
+            if not dependencies:
+                break
+            path.append(max(dependencies, key=lambda name: self.timings[name][1]))
+        return path[::-1]
@@ -0,0 +1,147 @@
+# classes/query_planner.py
+
+# query planner for BaseDataset.search(): a search pattern maps column labels to predicates, all of which must hold.
+# a predicate is a list of values (equality, as before) or a tuple (operator, operands...), e.g.,
+#   {"user_id": ["root", "admin"], "Unix_Timestamp_Sec": ("between", t0, t1), "ossh_host": ("prefix", "Lab")}
+# the planner estimates the selectivity of every predicate (exact from a column index, otherwise on an evenly spaced
+# sample of rows) and evaluates the most selective one first. the following predicates are ANDed into the same boolean
+# mask in place, or - once few rows are left - evaluated on the remaining rows only. no filtered frames are copied.
+import numpy as np
+import pandas as pd
+
+
+class QueryPlanner:
+
+    OP_IN = "in"                    # ("in", [values]) - same as a plain list of values
+    OP_BETWEEN = "between"          # ("between", low, high) - both ends included
+    OP_GE = ">="
+    OP_GT = ">"
+    OP_LE = "<="
+    OP_LT = "<"
+    OP_PREFIX = "prefix"            # ("prefix", "text") - string values that start with the text
+    OPERAND_COUNTS = {OP_IN: 1, OP_BETWEEN: 2, OP_GE: 1, OP_GT: 1, OP_LE: 1, OP_LT: 1, OP_PREFIX: 1}
+
+    SAMPLE_ROWS = 1024              # rows used to estimate the selectivity of a predicate
+    SUBSET_FRACTION = 0.05          # below this fraction of remaining rows, predicates are evaluated on those rows only
+
+    def __init__(self, dataframe, column_index=None):
+        """
+        Args:
+            dataframe (pd.DataFrame): the searched dataframe
+            column_index (callable): column label -> ColumnIndex, used for equality predicates; None = no indexes
+        """
+        self.df = dataframe
+        self.column_index = column_index
+
+
+    @classmethod
+    def parse_predicate(cls, predicate):
+        """
+        returns: (operator, operands) of a predicate given as a list of values or an (operator, operands...) tuple.
+        """
+        if isinstance(predicate, tuple) and predicate and isinstance(predicate[0], str) and predicate[0] in cls.OPERAND_COUNTS:
+            operator, operands = predicate[0], predicate[1:]
+            if len(operands) != cls.OPERAND_COUNTS[operator]:
+                raise ValueError(f"Search predicate '{operator}' takes {cls.OPERAND_COUNTS[operator]} operand(s), got {len(operands)}.")
+        else:
+            operator, operands = cls.OP_IN, (predicate,)
+        if operator == cls.OP_IN:
+            # Handle NaN values in both the column and search values
+            operands = ([np.nan if pd.isna(value) else value for value in operands[0]],)
+        return operator, operands
+
+
+    @classmethod
+    def evaluate(cls, column, operator, operands):
+        """
+        evaluates a predicate on a column (Series).
+        returns: boolean numpy array, False where the column value is missing (except for missing values searched with "in").
+        """
+        if operator == cls.OP_IN:
+            return column.isin(operands[0]).to_numpy(dtype=bool)
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # evaluated once per category, then spread over the rows by the category codes (-1 = missing = False)
+            category_mask = cls.evaluate(pd.Series(column.cat.categories), operator, operands)
+            return np.append(category_mask, False)[column.cat.codes.to_numpy()]
+
+        if operator == cls.OP_BETWEEN:
+            mask = column.between(operands[0], operands[1])
+        elif operator == cls.OP_GE:
+            mask = column >= operands[0]
+        elif operator == cls.OP_GT:
+            mask = column > operands[0]
+        elif operator == cls.OP_LE:
+            mask = column <= operands[0]
+        elif operator == cls.OP_LT:
+            mask = column < operands[0]
+        else:
+            strings = column if pd.api.types.is_string_dtype(column.dtype) else column.astype("str").where(column.notna())
+            mask = strings.str.startswith(operands[0], na=False)
+        return mask.to_numpy(dtype=bool, na_value=False)
+
+
+    def plan(self, search_pattern):
+        """
+        returns: list of (selectivity, column label, operator, operands, uses index), most selective first.
+        """
+        steps = []
+        for col, predicate in search_pattern.items():
+            operator, operands = self.parse_predicate(predicate)
+            uses_index = operator == self.OP_IN and self.column_index is not None
+            # nothing to order with a single predicate
+            selectivity = self.estimate(col, operator, operands, uses_index) if len(search_pattern) > 1 else 0.0
+            steps.append((selectivity, col, operator, operands, uses_index))
+        steps.sort(key=lambda step: step[0])        # stable: equal estimates keep the pattern order
+        return steps
+
+
+    def estimate(self, col, operator, operands, uses_index=False):
+        """
+        returns: estimated fraction of rows that satisfy the predicate.
+        """
+        num_rows = len(self.df)
+        if not num_rows:
+            return 0.0
+        if uses_index:
+            return len(self.column_index(col).positions(operands[0])) / num_rows
+        sample = np.unique(np.linspace(0, num_rows - 1, min(num_rows, self.SAMPLE_ROWS)).astype(np.int64))
+        return float(self.evaluate(self.df[col].iloc[sample], operator, operands).mean())
+
+
+    def positions(self, search_pattern):
+        """
+        returns: ascending row positions (np.ndarray) of the rows that satisfy all predicates of the search pattern.
+        """
+        num_rows = len(self.df)
+        mask = None                 # boolean mask over all rows, while many rows remain
+        positions = None            # row positions, once few rows remain (or from an index)
+
+        for _, col, operator, operands, uses_index in self.plan(search_pattern):
+            if mask is not None and np.count_nonzero(mask) <= self.SUBSET_FRACTION * num_rows:
+                positions, mask = np.flatnonzero(mask), None
+
+            if uses_index:
+                index_positions = self.column_index(col).positions(operands[0])
+                if mask is not None:
+                    index_mask = np.zeros(num_rows, dtype=bool)
+                    index_mask[index_positions] = True
+                    mask &= index_mask
+                elif positions is None:
+                    positions = index_positions
+                else:
+                    positions = np.intersect1d(positions, index_positions, assume_unique=True)
+            elif positions is not None:
+                positions = positions[self.evaluate(self.df[col].iloc[positions], operator, operands)]
+            elif mask is not None:
+                np.logical_and(mask, self.evaluate(self.df[col], operator, operands), out=mask)
+            else:
+                mask = self.evaluate(self.df[col], operator, operands)
+                if not mask.flags.writeable:        # a view of pandas data: the next predicates are ANDed in place
+                    mask = mask.copy()
+
+            if positions is not None and not len(positions):
+                break
+
+        if mask is not None:
+            return np.flatnonzero(mask)
+        return np.arange(num_rows) if positions is None else positions
@@ -0,0 +1,26 @@
+# classes/structured_queue_handler.py
+
+# queue handler for Logger's queue mode. QueueHandler.prepare() formats the record into its message on the logging
+# thread - the traceback included - and drops exc_info, so that the record can be queued (a traceback holds frames).
+# this handler merges only the message arguments and keeps the formatted traceback apart in exc_text: the formatter
+# of the listener thread writes it as usual (text format) or into its own field (JsonLinesFormatter).
+import copy
+import logging
+from logging.handlers import QueueHandler
+
+
+class StructuredQueueHandler(QueueHandler):
+
+    exception_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        """
+        returns: a copy of the record with the message arguments merged, and the exception formatted into exc_text.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.exception_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
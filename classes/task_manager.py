@@ -1,61 +1,396 @@
 # classes/task_manager.py
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+from collections import deque
+import asyncio
 import datetime
+import heapq
+import itertools
+import os
+import pickle
+import sys
+import threading
+import time
 
 
 from classes.logger import Logger
 logger = Logger().get_logger()
 
+from classes.custom_exceptions import TaskQueueFull
+
 
 # task manager is implemented as a singleton, to make sure there is a single centralized task management functionality available across the entire project/
+# tasks run on a thread pool (I/O, tasks that update shared objects) or, for CPU-bound work that the GIL would serialize
+# on threads (parsing, feature calculation), on a process pool. the process pool is started on the first process task.
+# submitted tasks wait in a bounded priority queue of the task manager; a pool only ever gets as many tasks as it has
+# workers, the next one (highest priority first, FIFO within a priority) when a worker becomes free. when the queue is
+# full, submit blocks until there is room (backpressure) or raises TaskQueueFull. completed futures are dropped from the
+# tracked set by a done-callback, so the bookkeeping cost per task stays constant however many tasks are submitted.
+# per pool, the task manager records how long tasks waited in the queue and ran, their outcome, and how busy the workers
+# are (stats(), optionally logged periodically with log_stats_every()) - to size max_threads and to tell whether the
+# pool is the bottleneck (tasks wait long, workers always busy) or the tasks themselves (e.g., I/O).
+# asyncio code awaits tasks with submit_async(): the task Future is awaited through asyncio.wrap_future(), so any number
+# of tasks can be in flight from one event loop without a thread per awaiting coroutine.
+
+
+def run_in_process(fn, args, kwargs, min_shared_bytes):
+    """
+    process pool worker: runs the task and returns its result. large results (e.g., dataframes) are pickled with
+    protocol 5 and their data buffers (numpy / Arrow column buffers) are passed out-of-band in a shared memory block,
+    so that only the small pickle goes through the result pipe. see TaskManager.receive_result().
+    must stay a module level function, so that it can be pickled.
+    """
+    result = fn(*args, **kwargs)
+    buffers = []
+    payload = pickle.dumps(result, protocol=5, buffer_callback=buffers.append)
+    buffers = [buffer.raw() for buffer in buffers]
+    total_bytes = sum(buffer.nbytes for buffer in buffers)
+    if total_bytes < min_shared_bytes:
+        return result
+
+    # the block lives on until the receiving process unlinks it: this process must not clean it up on exit
+    untracked = sys.version_info >= (3, 13)
+    if untracked:
+        block = shared_memory.SharedMemory(create=True, size=total_bytes, track=False)
+    else:
+        block = shared_memory.SharedMemory(create=True, size=total_bytes)
+    layout = []
+    offset = 0
+    for buffer in buffers:
+        block.buf[offset:offset + buffer.nbytes] = buffer.cast("B")
+        layout.append((offset, buffer.nbytes))
+        offset += buffer.nbytes
+    block.close()
+    if not untracked and os.name == "posix":    # only POSIX blocks are registered with the resource tracker, as "/name"
+        resource_tracker.unregister("/" + block.name, "shared_memory")
+    return (TaskManager.SHARED_RESULT, payload, block.name, layout)
+
 
 class TaskManager:
     _instance = None  # Singleton instance
+    MODE_THREAD = "thread"
+    MODE_PROCESS = "process"
+    MODES = (MODE_THREAD, MODE_PROCESS)
+    SHARED_RESULT = "task_manager_shared_result"      # marks results passed through shared memory
+    MIN_SHARED_BYTES = 1024 * 1024                  # smaller process task results are simply pickled
+    PRIORITY_HIGH = 0                               # lower value runs first
+    PRIORITY_NORMAL = 1
+    PRIORITY_LOW = 2
+    MAX_QUEUED = 10000                              # tasks waiting for a worker, default
+    QUEUE_RETRY_SECS = 0.05                         # submit_async(): pause before retrying to queue into a full queue
+    STATS_WINDOW = 1000                             # recent tasks used for the wait / run time percentiles
 
-    def __new__(cls, max_threads=2):                # 6 threads for normal operation.
+    def __new__(cls, max_threads=2, max_queued=MAX_QUEUED):                # 6 threads for normal operation.
         if cls._instance is None:
             cls._instance = super(TaskManager, cls).__new__(cls)
             cls._instance.executor = ThreadPoolExecutor(max_threads)
-            cls._instance.futures = []              # computations that have not yet completed
+            cls._instance.futures = set()           # computations that have not yet completed
             cls._instance.max_threads = max_threads
+            cls._instance.process_executor = None   # started on first use
+            cls._instance.max_processes = os.cpu_count() or 1
+            cls._instance.max_queued = max_queued
+            cls._instance.queues = {mode: [] for mode in cls.MODES}        # heaps of (priority, sequence, future, fn, args, kwargs)
+            cls._instance.running = {mode: 0 for mode in cls.MODES}        # tasks handed to each pool
+            cls._instance.num_queued = 0
+            cls._instance.sequence = itertools.count()                     # FIFO order within a priority
+            cls._instance.lock = threading.Condition()
+            cls._instance.stats_logger = None                              # (thread, stop event) of log_stats_every()
+            cls._instance.reset_stats()
             logger.info(f"Task Manager initialized with {max_threads} threads.")
         return cls._instance
 
 
     def submit(self, fn, *args, **kwargs):
         """
-        submit a task to the thread pool and track its Future.
-        completed tasks are cleaned up from the task list.
+        submit a task to the thread pool (normal priority) and track its Future.
+        blocks while the task queue is full.
+        """
+        return self.submit_task(fn, args, kwargs)
+
+
+    def submit_process(self, fn, *args, **kwargs):
+        """
+        submit a CPU-bound task to the process pool and track its Future; same use as submit().
+        fn, its arguments and its result must be picklable (e.g., module level functions, classmethods).
+        large results such as dataframes come back through shared memory, see run_in_process().
         """
-        # Cleanup completed Futures before adding a new one
-        self._cleanup_futures()
+        return self.submit_task(fn, args, kwargs, mode=self.MODE_PROCESS)
 
-        future = self.executor.submit(fn, *args, **kwargs)
-        self.futures.append(future)
+
+    def submit_mode(self, mode, fn, *args, **kwargs):
+        """
+        submit a task to the thread pool (MODE_THREAD) or the process pool (MODE_PROCESS).
+        """
+        return self.submit_task(fn, args, kwargs, mode=mode)
+
+
+    def submit_task(self, fn, args=(), kwargs=None, mode=MODE_THREAD, priority=PRIORITY_NORMAL, block=True,
+                    timeout=None, track=True):
+        """
+        queue a task fn(*args, **kwargs) for the thread or the process pool.
+
+        Args:
+            mode (str): MODE_THREAD or MODE_PROCESS
+            priority (int): PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW (or any int, lower runs first)
+            block (bool): if the queue is full, wait for room (True) or raise TaskQueueFull at once (False).
+                          a task that submits tasks itself should not block, it holds a worker while waiting
+            timeout (float): seconds to wait for room before raising TaskQueueFull, None = no limit
+            track (bool): track the Future (wait_for_all() waits for it)
+
+        returns: Future of the task; cancel() succeeds while the task is still queued
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported task mode '{mode}'. Supported modes: {list(self.MODES)}")
+        future = Future()
+        with self.lock:
+            if not self.lock.wait_for(lambda: self.num_queued < self.max_queued, timeout=timeout if block else 0):
+                self.task_counts[mode]["rejected"] += 1
+                raise TaskQueueFull(self.max_queued)
+            heapq.heappush(self.queues[mode], (priority, next(self.sequence), future, fn, args, kwargs or {}, time.perf_counter()))
+            self.num_queued += 1
+            self.task_counts[mode]["submitted"] += 1
+            if track:
+                self.futures.add(future)
+        if track:
+            future.add_done_callback(self._untrack)
+        self._dispatch(mode)
         return future
 
 
+    async def submit_async(self, fn, args=(), kwargs=None, mode=MODE_THREAD, priority=PRIORITY_NORMAL, timeout=None):
+        """
+        coroutine: runs fn(*args, **kwargs) on the thread or the process pool and returns its result, without blocking
+        the event loop. while the task queue is full, it waits on the event loop for room instead of blocking.
+        if the awaiting coroutine is cancelled or times out, a task that is still queued is cancelled; a task that is
+        already running completes, but its result is discarded.
+
+        Args:
+            mode, priority: see submit_task()
+            timeout (float): seconds until the result must be available (queue wait included), None = no limit
+
+        raises: TimeoutError if the timeout expires; the exception of the task if it failed
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            try:
+                future = self.submit_task(fn, args, kwargs, mode=mode, priority=priority, block=False)
+                break
+            except TaskQueueFull:
+                if deadline is not None and loop.time() >= deadline:
+                    raise TimeoutError(f"Task queue stayed full for {timeout} s, task not submitted.")
+                await asyncio.sleep(self.QUEUE_RETRY_SECS)
+        remaining = None if deadline is None else max(0.0, deadline - loop.time())
+        return await asyncio.wait_for(asyncio.wrap_future(future), remaining)
+
+
+    def _untrack(self, future):
+        with self.lock:
+            self.futures.discard(future)
+
+
+    def _slots(self, mode):
+        return self.max_threads if mode == self.MODE_THREAD else self.max_processes
+
+
+    def _dispatch(self, mode):
+        """
+        hands queued tasks to the pool of the mode while it has idle workers.
+        """
+        while True:
+            with self.lock:
+                if self.running[mode] >= self._slots(mode) or not self.queues[mode]:
+                    return
+                _, _, future, fn, args, kwargs, queued_at = heapq.heappop(self.queues[mode])
+                self.num_queued -= 1
+                self.lock.notify_all()                  # room in the queue for blocked submitters
+                if not future.set_running_or_notify_cancel():
+                    self.task_counts[mode]["cancelled"] += 1
+                    continue                            # cancelled while queued
+                self.running[mode] += 1
+                started_at = time.perf_counter()
+                self.wait_times[mode].append(started_at - queued_at)
+
+                # handed to the pool under the lock: reset() and set_max_threads() swap the pools under the lock, too,
+                # so a task never goes to a pool that is being shut down
+                try:
+                    if mode == self.MODE_THREAD:
+                        pool_future = self.executor.submit(self._run, future, fn, args, kwargs)
+                    else:
+                        if self.process_executor is None:
+                            self.process_executor = ProcessPoolExecutor(self.max_processes)
+                            logger.info(f"Task Manager started a process pool with {self.max_processes} processes.")
+                        pool_future = self.process_executor.submit(run_in_process, fn, args, kwargs, self.MIN_SHARED_BYTES)
+                except Exception as e:                  # e.g., the process pool is broken
+                    future.set_exception(e)
+                    self.running[mode] -= 1
+                    self.task_counts[mode]["failed"] += 1
+                    continue
+            pool_future.add_done_callback(
+                lambda done, mode=mode, future=future, started_at=started_at: self._task_done(mode, future, done, started_at))
+
+
+    def _task_done(self, mode, future, pool_future, started_at):
+        if mode == self.MODE_PROCESS:
+            self._resolve(future, pool_future)
+        run_time = time.perf_counter() - started_at
+        with self.lock:
+            self.running[mode] -= 1
+            self.run_times[mode].append(run_time)
+            self.busy_secs[mode] += run_time
+            self.task_counts[mode]["failed" if future.exception() is not None else "completed"] += 1
+        self._dispatch(mode)
+
+
+    @staticmethod
+    def _run(future, fn, args, kwargs):
+        """
+        thread pool worker: runs the task and sets the outcome on its Future.
+        """
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+
+    @classmethod
+    def _resolve(cls, future, process_future):
+        """
+        passes the outcome of a process task on to the Future returned by submit_process().
+        """
+        try:
+            future.set_result(cls.receive_result(process_future.result()))
+        except BaseException as e:
+            future.set_exception(e)
+
+
+    @classmethod
+    def receive_result(cls, result):
+        """
+        rebuilds a process task result. if it was passed through shared memory, its buffers are copied out of the block
+        and the block is released.
+        """
+        if not (isinstance(result, tuple) and len(result) == 4 and result[0] == cls.SHARED_RESULT):
+            return result
+        _, payload, block_name, layout = result
+        block = shared_memory.SharedMemory(name=block_name)
+        try:
+            buffers = [bytearray(block.buf[offset:offset + nbytes]) for offset, nbytes in layout]
+        finally:
+            block.close()
+            block.unlink()
+        return pickle.loads(payload, buffers=buffers)
+
+
     def submit_untracked(self, fn, *args, **kwargs):
         """
         submit a task to the thread pool without tracking its Future.
         """
-        self.executor.submit(fn, *args, **kwargs)
+        self.submit_task(fn, args, kwargs, track=False)
+
+
+    def pending_count(self):
+        """
+        returns: number of tracked tasks that have not completed (queued or running).
+        """
+        with self.lock:
+            return len(self.futures)
+
+
+    def reset_stats(self):
+        """
+        starts the task statistics over, e.g., before a run that is to be measured.
+        """
+        with self.lock:
+            self.stats_since = time.perf_counter()
+            self.task_counts = {mode: dict.fromkeys(("submitted", "completed", "failed", "cancelled", "rejected"), 0)
+                                for mode in self.MODES}
+            self.wait_times = {mode: deque(maxlen=self.STATS_WINDOW) for mode in self.MODES}    # secs queued, recent tasks
+            self.run_times = {mode: deque(maxlen=self.STATS_WINDOW) for mode in self.MODES}     # secs running, recent tasks
+            self.busy_secs = {mode: 0.0 for mode in self.MODES}                                 # sum of all run times
+
+
+    def stats(self):
+        """
+        returns: dictionary mode -> statistics of the pool since the start (or reset_stats()):
+            workers, running, queued: pool size, tasks running and waiting now
+            utilization: running / workers now
+            busy_fraction: share of the worker time spent running tasks since the start
+            submitted, completed, failed, cancelled, rejected: task counts
+            wait_avg, wait_p95, wait_max, run_avg, run_p95, run_max: seconds, over the last STATS_WINDOW tasks
+        """
+        with self.lock:
+            elapsed = max(time.perf_counter() - self.stats_since, 1e-9)
+            stats = {}
+            for mode in self.MODES:
+                workers = self._slots(mode)
+                mode_stats = {"workers": workers, "running": self.running[mode], "queued": len(self.queues[mode]),
+                              "utilization": self.running[mode] / workers if workers else 0.0,
+                              "busy_fraction": min(1.0, self.busy_secs[mode] / (workers * elapsed)) if workers else 0.0}
+                mode_stats.update(self.task_counts[mode])
+                for name, times in (("wait", self.wait_times[mode]), ("run", self.run_times[mode])):
+                    ordered = sorted(times)
+                    mode_stats[f"{name}_avg"] = sum(ordered) / len(ordered) if ordered else 0.0
+                    mode_stats[f"{name}_p95"] = ordered[int(0.95 * (len(ordered) - 1))] if ordered else 0.0
+                    mode_stats[f"{name}_max"] = ordered[-1] if ordered else 0.0
+                stats[mode] = mode_stats
+        return stats
+
+
+    def log_stats(self):
+        """
+        writes a snapshot of stats() to the log, one line per pool that has been used.
+        """
+        for mode, mode_stats in self.stats().items():
+            if not mode_stats["submitted"]:
+                continue
+            logger.info(f"Task Manager {mode} pool: {mode_stats['running']}/{mode_stats['workers']} workers busy, "
+                        f"{mode_stats['queued']} queued, busy {mode_stats['busy_fraction']:.0%} of the time; "
+                        f"tasks submitted {mode_stats['submitted']}, completed {mode_stats['completed']}, "
+                        f"failed {mode_stats['failed']}, cancelled {mode_stats['cancelled']}, rejected {mode_stats['rejected']}; "
+                        f"wait avg {mode_stats['wait_avg']:.3f} s p95 {mode_stats['wait_p95']:.3f} s, "
+                        f"run avg {mode_stats['run_avg']:.3f} s p95 {mode_stats['run_p95']:.3f} s.")
+
+
+    def log_stats_every(self, interval_secs):
+        """
+        logs a stats snapshot every interval_secs seconds from a background thread; None or 0 stops the logging.
+        """
+        if self.stats_logger is not None:
+            thread, stop = self.stats_logger
+            stop.set()
+            thread.join()
+            self.stats_logger = None
+        if not interval_secs:
+            return
+
+        stop = threading.Event()
+
+        def log_periodically():
+            while not stop.wait(interval_secs):
+                self.log_stats()
+
+        thread = threading.Thread(target=log_periodically, name="TaskManagerStats", daemon=True)
+        thread.start()
+        self.stats_logger = (thread, stop)
 
 
     def wait_for_all(self):
         """
-        Wait for all tracked tasks to complete.
+        Wait for all tracked tasks to complete, including the tasks submitted while waiting.
         """
         print("Waiting for all tasks to complete...")
-        for future in as_completed(self.futures):
-            try:
-                result = future.result()
-                logger.info(f"[{datetime.datetime.now()}] Task completed with result: {result}") # Wait for task completion
-            except Exception as e:
-                logger.error(f"Task failed with error: {e}")
-
-        # Clean up all Futures after completion
-        self._cleanup_futures()
+        while True:
+            with self.lock:
+                pending = list(self.futures)
+            if not pending:
+                break
+            for future in as_completed(pending):
+                try:
+                    result = future.result()
+                    logger.info(f"[{datetime.datetime.now()}] Task completed with result: {result}") # Wait for task completion
+                except Exception as e:
+                    logger.error(f"Task failed with error: {e}")
         logger.info("All tasks completed.")
 
 
@@ -64,29 +399,55 @@ class TaskManager:
         Set the number of threads for the thread pool.
         """
         if not self.futures:  # Ensure no tasks are in progress
-            self.executor = ThreadPoolExecutor(max_threads)
-            self.max_threads = max_threads
+            with self.lock:
+                old_executor = self.executor
+                self.executor = ThreadPoolExecutor(max_threads)
+                self.max_threads = max_threads
+            old_executor.shutdown(wait=True)
+            self._dispatch(self.MODE_THREAD)        # untracked tasks may be queued
         else:
             logger.error("Cannot change thread count while tasks are running.")
             raise RuntimeError("Cannot change thread count while tasks are running.")
 
 
-    def reset(self, max_threads):
+    def set_max_processes(self, max_processes):
         """
-        set a new maximum thread count.
+        Set the number of processes for the process pool (started on the next process task).
         """
-        if self.executor is not None:
-            self.executor.shutdown(wait=True)
-        self.executor = ThreadPoolExecutor(max_threads)
-        self.max_threads = max_threads
-        logger.info(f"Task Manager reset with {max_threads} threads.")
+        if self.futures:
+            logger.error("Cannot change process count while tasks are running.")
+            raise RuntimeError("Cannot change process count while tasks are running.")
+        if self.process_executor is not None:
+            self.process_executor.shutdown(wait=True)
+            self.process_executor = None
+        self.max_processes = max_processes
 
 
-    def _cleanup_futures(self):
+    def set_max_queued(self, max_queued):
+        """
+        Set the number of tasks that may wait for a worker before submit blocks or rejects.
         """
-        remove completed futures from the list.
+        with self.lock:
+            self.max_queued = max_queued
+            self.lock.notify_all()
+
+
+    def reset(self, max_threads):
         """
-        self.futures = [f for f in self.futures if not f.done()]
+        set a new maximum thread count.
+        """
+        # the new pools take over first: queued tasks continue on them while the old pools finish their running tasks
+        with self.lock:
+            old_executors = [self.executor, self.process_executor]
+            self.executor = ThreadPoolExecutor(max_threads)
+            self.max_threads = max_threads
+            self.process_executor = None            # started again on the next process task
+        for executor in old_executors:
+            if executor is not None:
+                executor.shutdown(wait=True)
+        logger.info(f"Task Manager reset with {max_threads} threads.")
+        for mode in self.MODES:
+            self._dispatch(mode)
 
 
     @classmethod
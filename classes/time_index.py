@@ -0,0 +1,88 @@
+# classes/time_index.py
+
+# sorted index of a timestamp column (Unix seconds), for time-range queries with binary search (np.searchsorted)
+# instead of scanning the column. if the column is already in time order (e.g., after OpenSSHLogonData.calculate_features(),
+# which sorts by Unix_Timestamp_Secs) the index keeps no permutation: a time range is a contiguous slice of rows.
+# rows without a timestamp are not indexed (never returned by a time range).
+import numpy as np
+
+
+class TimeIndex:
+
+    def __init__(self, timestamps):
+        """
+        Args:
+            timestamps (pd.Series): timestamps in Unix seconds (numeric, missing values allowed)
+        """
+        values = timestamps.to_numpy(dtype=float, na_value=np.nan)
+        is_valid = ~np.isnan(values)
+        self.num_valid = int(np.count_nonzero(is_valid))
+        valid_first = is_valid[:self.num_valid].all()           # missing timestamps only at the end (sort_values default)
+        if valid_first and not (np.diff(values[:self.num_valid]) < 0).any():
+            self.order = None                                    # rows are in time order already
+            self.sorted_times = values[:self.num_valid]
+        else:
+            self.order = np.argsort(values, kind="stable")[:self.num_valid]      # NaN sorts last
+            self.sorted_times = values[self.order]
+
+
+    @property
+    def is_row_order(self):
+        """
+        True if the rows are in time order (a time range is a contiguous slice of rows).
+        """
+        return self.order is None
+
+
+    def bounds(self, start=None, end=None):
+        """
+        returns: (first, last + 1) position in the sorted timestamps of start <= timestamp <= end; None = open end.
+        """
+        first = 0 if start is None else int(np.searchsorted(self.sorted_times, start, side="left"))
+        last = self.num_valid if end is None else int(np.searchsorted(self.sorted_times, end, side="right"))
+        return first, max(first, last)
+
+
+    def range(self, start=None, end=None):
+        """
+        returns: ascending row positions (np.ndarray) of the rows with start <= timestamp <= end.
+        """
+        first, last = self.bounds(start, end)
+        if self.order is None:
+            return np.arange(first, last)
+        return np.sort(self.order[first:last])
+
+
+    def latest(self):
+        """
+        returns: the latest timestamp, None if there is none.
+        """
+        return float(self.sorted_times[-1]) if self.num_valid else None
+
+
+    def bucket_counts(self, bucket_secs, start=None, end=None, include_empty=True):
+        """
+        counts the timestamps in fixed buckets of bucket_secs seconds, aligned to multiples of bucket_secs
+        (e.g., whole minutes or hours). the timestamps are sorted, so are their buckets: a bucket is a run of equal
+        bucket numbers, and its count the length of the run.
+
+        Args:
+            bucket_secs (int): bucket size in seconds
+            start, end (float): count only timestamps in [start, end], None = open end
+            include_empty (bool): include the empty buckets between the first and the last one (count 0)
+
+        returns: (bucket start times as int64 numpy array, counts as int64 numpy array)
+        """
+        first, last = self.bounds(start, end)
+        buckets = np.floor(self.sorted_times[first:last] / bucket_secs).astype(np.int64)
+        if not len(buckets):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        run_starts = np.flatnonzero(np.diff(buckets)) + 1
+        bucket_numbers = buckets[np.concatenate(([0], run_starts))]
+        counts = np.diff(np.concatenate(([0], run_starts, [len(buckets)])))
+        if include_empty:
+            dense_counts = np.zeros(bucket_numbers[-1] - bucket_numbers[0] + 1, dtype=np.int64)
+            dense_counts[bucket_numbers - bucket_numbers[0]] = counts
+            bucket_numbers, counts = np.arange(bucket_numbers[0], bucket_numbers[-1] + 1), dense_counts
+        return bucket_numbers * bucket_secs, counts.astype(np.int64)
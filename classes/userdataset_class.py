@@ -13,12 +13,19 @@ task_mgr = TaskManager.get_taskmgr(max_threads=2)
 
 
 from classes.basedataset_class import BaseDataset, DatasetConfig
+from constants import ACCOUNT_STAT_FIELD, DAYS_TILL_PWD_CHANGE_FIELD
 from decorators import requires_loaded_data
 
 class UserDataset(BaseDataset):
     
 
     USER_ID_COL = 'user_id'
+
+    # typed csv columns (nullable types, so that blank values load as <NA>)
+    CSV_SCHEMA = {
+        ACCOUNT_STAT_FIELD: "boolean",
+        DAYS_TILL_PWD_CHANGE_FIELD: "Int64",
+    }
     
     def __init__(self, dataset_config: DatasetConfig):
         super().__init__(dataset_config=dataset_config)
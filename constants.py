@@ -14,4 +14,8 @@ DAYS_TILL_PWD_CHANGE_FIELD = 'days_till_password_change'
 # define input formats
 FORMAT_CSV = "csv"
 FORMAT_JSON = "json"
-FORMAT_OPENSSH = "opensshlog"
\ No newline at end of file
+FORMAT_OPENSSH = "opensshlog"
+
+# define output formats (besides csv)
+FORMAT_PARQUET = "parquet"
+FORMAT_FEATHER = "feather"              # Arrow IPC file
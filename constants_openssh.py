@@ -12,9 +12,15 @@ OSSH_PORT = "ossh_port"
 OSSH_DETAILS = "ossh_details"           # stuff at the end of the line that cannot be parrsed
 OSSH_MSG = "ossh_message"               # more freetext stuff
 OSSH_RAW = "ossh_raw"                   # raw log entry
+OSSH_RAW_OFFSET = "ossh_raw_offset"     # byte offset of the raw log entry in the log file (mmap parsing engine)
+OSSH_RAW_LENGTH = "ossh_raw_length"     # byte length of the raw log entry in the log file (mmap parsing engine)
 OSSH_EVENT_PATTERN = "ossh_event_pattern"
 OSSH_UID = "ossh_uid"                   # user id for the authentication process
 OSSH_EUID = "ossh_euid"                 # effective user id for the authentication process
 OSSH_TTY = "ossh_tty"                   # terminal device id
 OSSH_RUSER = "ossh_ruser"               # remote user
 OSSH_LOGNAME = "ossh_logname"           # yet another login name
+
+# ip address in a log message: IPv6 (incl. IPv4-mapped, e.g., ::ffff:10.0.0.1), or IPv4.
+# an IPv6 address must end with a hex digit, so that a trailing colon (e.g., "disconnect from 2001:db8::1: 11: Bye") is not taken.
+OSSH_IP_ADDR_REGEX = r'(?:(?:[0-9A-Fa-f]{0,4}:){2,7}(?:\d{1,3}(?:\.\d{1,3}){3}|[0-9A-Fa-f]{1,4})|[\d\.]+)'
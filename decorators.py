@@ -30,4 +30,19 @@ def log_method_call(method):
         print(f"[{end_time}] Finished method: {method.__name__}")
         
         return result
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+
+def invalidates_indexes(method):
+    """
+    marks a method that changes self.df in place (adds, overwrites or reorders data): the cached indexes of the dataset
+    (see BaseDataset.get_column_index()) are dropped after the call, as they may no longer match the data.
+    replacing self.df as a whole invalidates them anyway.
+    """
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.invalidate_indexes()
+    return wrapper
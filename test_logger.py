@@ -0,0 +1,34 @@
+# check of the Logger queue mode with JSON lines output: exceptions logged from any thread are written as structured
+# "exception" fields, not folded into the message. run from a scratch directory (writes ./test_logger.log).
+import json
+import threading
+
+from classes.logger import Logger
+
+LOG_FILE = "./test_logger.log"
+
+logger_instance = Logger(log_file=LOG_FILE, queue_mode=True, json_format=True)
+logger = logger_instance.get_logger()
+
+
+def log_failure():
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("division failed in %s", threading.current_thread().name)
+
+
+worker = threading.Thread(target=log_failure, name="worker")
+worker.start()
+worker.join()
+log_failure()
+logger_instance.set_queue_mode(False)       # writes out the queued records
+
+with open(LOG_FILE) as log_file:
+    entries = [json.loads(line) for line in log_file if line.strip()]
+failures = [entry for entry in entries if entry["message"].startswith("division failed")]
+assert [entry["message"] for entry in failures] == ["division failed in worker", "division failed in MainThread"], failures
+for entry in failures:
+    assert "ZeroDivisionError" in entry["exception"], entry
+    assert "Traceback" not in entry["message"], entry
+print("logger queue mode + JSON lines: OK")
@@ -51,7 +51,7 @@ def main():
     print(f"Users present in both {users_a.get_id()} and {users_b.get_id()}: {common_users}")
 
     # find disabled users in system A
-    disabled_users_a = users_a.search(search_pattern={ACCOUNT_STAT_FIELD: ["False"]},return_col=USERID_FIELD)
+    disabled_users_a = users_a.search(search_pattern={ACCOUNT_STAT_FIELD: [False]},return_col=USERID_FIELD)
     print(f"Disabled users in {users_a.get_id()}: {disabled_users_a}")
     # enhance the datasets by adding current date as the load date.
     
@@ -9,20 +9,19 @@
 # OpenSSH logfile sourced from Loghub: A Large Collection of System Log Datasets for AI-driven Log Analytics
 # loghub's GitHub site: https://github.com/logpai/loghub
 # OpenSSH log: https://zenodo.org/records/8196385/files/SSH.tar.gz?download=1
-import pandas as pd
-from datetime import datetime, timezone
 
 # initialize global logger & task manager
 # NB, logger comes first because task manager uses logger
 from classes.logger import Logger
-logger = Logger().get_logger()
+logger = Logger(queue_mode=True).get_logger()     # log file written from a listener thread, not from the worker threads
 
 from classes.task_manager import TaskManager
 task_mgr = TaskManager.get_taskmgr(max_threads=2)
 
-from classes.basedataset_class import BaseDataset, DatasetConfig
+from classes.basedataset_class import DatasetConfig
 from classes.opensshlog_class import OpenSSHLogonData
 from classes.userdataset_class import UserDataset
+from classes.pipeline_scheduler import PipelineScheduler
 from constants import *
 from constants_openssh import *
 
@@ -35,6 +34,7 @@ def main():
 
 
     # define configuration parameters for datasets
+    # the log can also be read straight from the downloaded archive: data_input_path="./downloads/OpenSSH_log.tar.gz::SSH.log"
     openssh_log_config = DatasetConfig(dataset_id="OpenSSH sample log", data_input_path="./data_in/SSH.log",
                                 data_output_path="./SSH_Log_data.csv",
                                 mandatory_fields=openssh_log_fields, data_input_format=FORMAT_OPENSSH,
@@ -57,44 +57,37 @@ def main():
     users_b = UserDataset(dataset_config=user_config_b)
     openssh_data = OpenSSHLogonData(dataset_config=openssh_log_config)
 
-    # now load data into the datasets as directed by the configuration
-    
-    # threaded data loading using task manager
-    openssh_data.load_data(use_taskmgr=True)
-    users_a.load_data(use_taskmgr=True)
-    users_b.load_data(use_taskmgr=True)
-
-    # regular data loading
+    # the processing steps of every dataset form a chain in a task graph: a step starts as soon as the previous step
+    # of the same dataset is done, so the small user datasets do not wait for the big OpenSSH log at every stage.
+    pipeline = PipelineScheduler(task_mgr)
+    pipeline.add_chain([
+        ("openssh load", openssh_data.load_data),
+        ("openssh cleanup", openssh_data.data_cleanup),
+        ("openssh features", openssh_data.calculate_features),        # identifying risky events
+        ("openssh save", openssh_data.save_data),                     # in the output format of the dataset config (csv by default)
+    ])
+    for users in (users_a, users_b):
+        pipeline.add_chain([
+            (f"{users.get_id()} load", users.load_data),
+            (f"{users.get_id()} load date", users.add_load_date),     # using default load date column and default date format
+            (f"{users.get_id()} save", users.save_as_csv, {"filepath": users.dataset_config.get_output_path()}),
+        ])
+
+    # regular (sequential) processing
     # openssh_data.load_data(use_taskmgr=False)
     # users_a.load_data(use_taskmgr=False)
     # users_b.load_data(use_taskmgr=False)
-
-    task_mgr.wait_for_all()         # do not proceed further until all data is loaded
-
-
-    openssh_data.data_cleanup()
-    print("identifying risky events")
-    openssh_data.calculate_features()
-
-
-    # add load date to system A users
-    users_a.add_load_date()     # using default load date column and default date format
-    users_b.add_load_date()
-
-   
-    print("writing output")
-    openssh_data.save_as_csv(use_taskmgr=True)
-    users_a.save_as_csv(filepath=users_a.dataset_config.get_output_path(), use_taskmgr=True)
-    users_b.save_as_csv(filepath=users_b.dataset_config.get_output_path(), use_taskmgr=True)
-
-    # save data without using task manager
+    # openssh_data.data_cleanup()
+    # openssh_data.calculate_features()
+    # users_a.add_load_date()
+    # users_b.add_load_date()
     # openssh_data.save_as_csv(use_taskmgr=False)
     # users_a.save_as_csv(filepath=users_a.dataset_config.get_output_path(), use_taskmgr=False)
     # users_b.save_as_csv(filepath=users_b.dataset_config.get_output_path(), use_taskmgr=False)
 
-    # wait for everything to complete.
-    task_mgr.wait_for_all()    
-
+    # run the task graph, wait for everything to complete.
+    pipeline.run()
+    task_mgr.log_stats()        # pool usage of the run, to size max_threads
 
     logger.info("all done")
 